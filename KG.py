@@ -1,5 +1,5 @@
 import streamlit as st
-import PyPDF2
+from pdf_extract import extract_text, read_pdf_bytes
 from typing import List, Tuple
 import os
 import google.generativeai as genai  # Changed import statement
@@ -22,11 +22,7 @@ genai.configure(api_key="")
 model = genai.GenerativeModel('gemini-pro')  # Changed client to model
 
 def extract_text_from_pdf(pdf_file) -> str:
-    pdf_reader = PyPDF2.PdfReader(pdf_file)
-    text = ""
-    for page in pdf_reader.pages:
-        text += page.extract_text()
-    return text
+    return extract_text(read_pdf_bytes(pdf_file)).text
 
 def create_graph():
     try:
@@ -1,38 +1,240 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, g, stream_with_context
 from flask_cors import CORS
-from PyPDF2 import PdfReader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-import google.generativeai as genai
-from langchain.vectorstores import FAISS
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.chains.question_answering import load_qa_chain
-from langchain.prompts import PromptTemplate
 from dotenv import load_dotenv
 import os
-from io import BytesIO
 import json
+import hashlib
+import hmac
+import itertools
+import threading
+import zipfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from clients import get_chat_model, get_embeddings, warm_up, BACKEND, EMBEDDING_MODEL
+from chunking import split_tokens, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS
+import index_factory
+from retrieval import hybrid_search
+from context import pack_context, QA_CANDIDATES
+from versions import diff_versions
+from pdf_cache import text_cache, document_hash, CLEAN_VERSION
+from vector_cache import vector_cache
+from document_store import document_store, DOC_ID_PATTERN
+from bulk import run_batch
+from jobs import job_queue, DONE, FAILED, CANCELLED
+from profile_match import extract_requirements, evaluate_requirements, format_findings, format_dropped, render_report, NOT_MET
+from profiles import profile_store
+from map_reduce import map_reduce, estimate_tokens, SECTION_TOKENS
+import metrics
+from llm_cache import llm_cache, track_request, cache_header, run_in_context
+from rate_limit import rate_limiter, set_priority, current_priority, RateLimitExceeded, INTERACTIVE, BULK
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
 load_dotenv()
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
-def process_pdf(pdf_file):
-    pdf_reader = PdfReader(BytesIO(pdf_file.read()))
-    text = ""
-    for page in pdf_reader.pages:
-        text += page.extract_text()
-    
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=10000, chunk_overlap=1000)
-    chunks = text_splitter.split_text(text)
+MODEL_NAME = "gemini-1.5-flash"
+# Cached answers are keyed by backend as well, so fake-backend runs never answer real traffic
+CACHE_MODEL = f"{BACKEND}:{MODEL_NAME}"
+TEMPERATURE = 0.3
+# Prompts get text with repeated headers, footers and page numbers removed
+STRIP_BOILERPLATE = os.getenv("STRIP_BOILERPLATE", "1") != "0"
+# Saved per-document indexes are only reused when built from the same text, chunks and index type
+INDEX_SETTINGS = hashlib.sha256(json.dumps([
+    BACKEND, EMBEDDING_MODEL, STRIP_BOILERPLATE, CLEAN_VERSION, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS,
+    index_factory.INDEX_TYPE, index_factory.VECTOR_STORAGE, index_factory.HNSW_M,
+]).encode("utf-8")).hexdigest()[:12]
+
+# Build the shared clients before the first request instead of on it
+if os.getenv("GOOGLE_API_KEY") or os.getenv("LLM_BACKEND") == "fake":
+    warm_up(chat_models=((MODEL_NAME, TEMPERATURE),))
+# Bump a version whenever its prompt changes so stale cached answers are skipped
+TEMPLATE_VERSIONS = {
+    "qa": 2,
+    "bid": 1,
+    "checklist": 1,
+    "contract": 1,
+    "verify": 3,
+    "chat": 1,
+}
+
+# Model calls from these routes go ahead of document analyses when quota is short
+INTERACTIVE_ENDPOINTS = {"ask_question", "chat"}
+
+@app.before_request
+def start_request_tracking():
+    g.request_start = time.perf_counter()
+    g.llm_cache_events = track_request()
+    g.stage_timings = metrics.track_request()
+    set_priority(INTERACTIVE if request.endpoint in INTERACTIVE_ENDPOINTS else BULK)
+
+@app.after_request
+def add_cache_headers(response):
+    events = getattr(g, "llm_cache_events", None)
+    status = cache_header(events)
+    if status:
+        response.headers["X-LLM-Cache"] = status
+        response.headers["X-LLM-Cache-Hits"] = str(sum(events))
+        response.headers["X-LLM-Cache-Misses"] = str(len(events) - sum(events))
+    return response
+
+@app.after_request
+def record_request_metrics(response):
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    elapsed = time.perf_counter() - g.request_start
+    metrics.request_seconds.observe(elapsed, route=route)
+    metrics.requests_total.inc(route=route, status=response.status_code)
+    if response.status_code >= 500:
+        metrics.errors_total.inc(route=route)
+    timings = getattr(g, "stage_timings", None) or []
+    response.headers["Server-Timing"] = ", ".join(
+        part for part in (metrics.server_timing(timings), f"total;dur={elapsed * 1000:.1f}") if part
+    )
+    return response
+
+def invoke_model(template, content, prompt):
+    def call_model(model):
+        with metrics.timed("generate"):
+            return model.invoke(prompt).content
+
+    def generate():
+        model = get_chat_model(MODEL_NAME, TEMPERATURE)
+        tokens = estimate_tokens(prompt)
+        metrics.record_prompt(template, prompt, tokens)
+        content = rate_limiter.call(lambda: call_model(model), tokens)
+        metrics.completion_chars_total.inc(len(content), template=template)
+        return content
+    return llm_cache.get_or_compute(template, TEMPLATE_VERSIONS[template], content, CACHE_MODEL, TEMPERATURE, generate)
+
+def stream_model(template, content, prompt):
+    # Read the priority while still in the request; the generator runs as the response is sent
+    priority = current_priority()
+
+    def generate():
+        key = llm_cache.make_key(template, TEMPLATE_VERSIONS[template], content, CACHE_MODEL, TEMPERATURE)
+        cached = llm_cache.get(key)
+        # A matching generation already running is waited on and sent whole; None means its client left
+        while cached is None:
+            flight = llm_cache.flights.begin(key)
+            if flight.leader:
+                break
+            cached = flight.wait()
+        if cached is not None:
+            yield cached
+            return
+
+        completion = error = None
+        try:
+            completion = llm_cache.lookup(key)
+            if completion is not None:
+                yield completion
+                return
+            model = get_chat_model(MODEL_NAME, TEMPERATURE)
+            tokens = estimate_tokens(prompt)
+            metrics.record_prompt(template, prompt, tokens)
+            parts = []
+            with metrics.timed("generate"):
+                for chunk in rate_limiter.stream(lambda: model.stream(prompt), tokens, priority):
+                    parts.append(chunk.content)
+                    yield chunk.content
+            completion = "".join(parts)
+            metrics.completion_chars_total.inc(len(completion), template=template)
+            llm_cache.put(key, template, completion)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            flight.finish(completion, error)
+    return generate()
+
+def query_flag(name):
+    # "?stream=1" and "?stream=true" opt in; "?stream=0" and "?stream=false" don't
+    return request.args.get(name, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+def wants_stream():
+    return query_flag('stream') or 'text/event-stream' in request.headers.get('Accept', '')
+
+def sse_response(tokens, **fields):
+    def generate():
+        # Headers are sent before the cache is consulted, so the hit/miss status goes in the done event
+        events = track_request()
+        try:
+            if fields:
+                yield f"event: meta\ndata: {json.dumps(fields)}\n\n"
+            for token in tokens:
+                if token:
+                    yield f"data: {json.dumps({'token': token})}\n\n"
+            status = cache_header(events)
+            yield f"event: done\ndata: {json.dumps({'llm_cache': status} if status else {})}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def wants_async():
+    return query_flag('async')
+
+def enqueue_analysis(kind, analysis):
+    # Only read the upload here; extraction and generation run on the job pool
+    if 'pdf' in request.files:
+        pdf_bytes = request.files['pdf'].read()
+        load_text = lambda: text_cache.get_text(pdf_bytes, STRIP_BOILERPLATE)[1]
+    else:
+        doc_id = request_value('doc_id')
+        if not doc_id:
+            return jsonify({"error": "No PDF file or doc_id provided"}), 400
+        if not document_store.exists(doc_id):
+            return jsonify({"error": "Unknown doc_id"}), 404
+        load_text = lambda: document_store.get_text(doc_id, STRIP_BOILERPLATE)
     
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-    vector_store = FAISS.from_texts(chunks, embedding=embeddings)
-    return vector_store
+    job = job_queue.submit(kind, lambda: analysis(load_text()))
+    return jsonify(job.to_dict()), 202, {"Location": f"/jobs/{job.id}"}
+
+def error_response(error):
+    # Quota exhaustion is the caller's cue to back off, not a server fault
+    if isinstance(error, RateLimitExceeded):
+        return jsonify({"error": str(error)}), 429, {"Retry-After": str(error.retry_after)}
+    return jsonify({"error": str(error)}), 500
+
+def is_admin():
+    # Admin routes stay closed until ADMIN_TOKEN is configured
+    admin_token = os.getenv("ADMIN_TOKEN")
+    return bool(admin_token) and hmac.compare_digest(request.headers.get("X-Admin-Token", ""), admin_token)
+
+def request_value(name):
+    value = request.form.get(name)
+    if value is None:
+        value = (request.get_json(silent=True) or {}).get(name)
+    return value
+
+def load_document():
+    # Accept either a fresh upload or the doc_id returned by /documents
+    if 'pdf' in request.files:
+        return text_cache.get_text(request.files['pdf'].read(), STRIP_BOILERPLATE)
+    doc_id = request_value('doc_id')
+    if not doc_id:
+        return None, None
+    return doc_id, document_store.get_text(doc_id, STRIP_BOILERPLATE)
+
+def build_vector_store(text, embeddings):
+    with metrics.timed("split"):
+        chunks = split_tokens(text)
+    with metrics.timed("embed_index"):
+        return index_factory.from_texts(chunks, embeddings)
+
+def get_vector_store(doc_hash, text):
+    embeddings = get_embeddings()
+    # Reuse the index built for an earlier question on the same document
+    return vector_cache.get_or_build(f"{doc_hash}-{INDEX_SETTINGS}", embeddings, lambda: build_vector_store(text, embeddings))
+
+def process_pdf(pdf_file):
+    doc_hash, text = text_cache.get_text(pdf_file.read(), STRIP_BOILERPLATE)
+    return get_vector_store(doc_hash, text)
 
-def get_answer(vector_store, question):
+def get_answer(vector_store, question, stream=False):
     prompt_template = """
     Answer the question as detailed as possible from the provided context, make sure to provide all the details, if the answer is not in the 
     provided context just say, "answer is not available in the context", don't provide the wrong answer\n
@@ -41,25 +243,58 @@ def get_answer(vector_store, question):
     Answer:
     """
     
-    model = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.3)
-    prompt = PromptTemplate(template=prompt_template, input_variables=["context", "question"])
-    chain = load_qa_chain(model, chain_type="stuff", prompt=prompt)
-    
-    docs = vector_store.similarity_search(question)
-    response = chain(
-        {"input_documents": docs, "question": question},
-        return_only_outputs=True
-    )
+    with metrics.timed("search"):
+        docs = hybrid_search(vector_store, question, k=QA_CANDIDATES)
+    with metrics.timed("pack"):
+        context = pack_context(docs)
     
-    return response["output_text"]
+    prompt = prompt_template.format(context=context, question=question)
+    content = question + "\x00" + context
+    if stream:
+        return stream_model("qa", content, prompt)
+    return invoke_model("qa", content, prompt)
+
+BID_PLACEHOLDERS = {
+    "REQUIRED QUALIFICATIONS": "No specific qualifications mentioned",
+    "REQUIRED CERTIFICATIONS": "No specific certifications mentioned",
+    "REQUIRED EXPERIENCE": "No specific experience requirements mentioned",
+    "MISSING OR UNCLEAR REQUIREMENTS": "No missing or unclear requirements identified",
+    "ELIGIBILITY FLAGS": "No eligibility issues identified",
+}
+
+CHECKLIST_PLACEHOLDERS = {
+    "DOCUMENT FORMAT REQUIREMENTS": "No specific format requirements mentioned in the document.",
+    "REQUIRED ATTACHMENTS": "No specific attachments mentioned",
+    "SUBMISSION FORMAT": "No specific format requirements mentioned",
+    "ADDITIONAL REQUIREMENTS": "No additional requirements identified",
+}
+
+CONTRACT_PLACEHOLDERS = {
+    "BIASED CLAUSES": "No biased clauses identified",
+    "TERMINATION RIGHTS": "No concerning termination rights found",
+    "LIABILITY AND INDEMNIFICATION": "Liability terms appear balanced",
+    "SUGGESTED MODIFICATIONS": "No modifications suggested",
+    "ADDITIONAL RISKS": "No additional risks identified",
+}
 
 def analyze_bid_requirements(text):
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY not found in environment variables")
-    
-    genai.configure(api_key=api_key)
+    # Documents over the section budget are analyzed per section and merged
+    return map_reduce(text, analyze_bid_section, BID_PLACEHOLDERS)
+
+def analyze_checklist_requirements(text):
+    return map_reduce(text, analyze_checklist_section, CHECKLIST_PLACEHOLDERS)
+
+def analyze_contract_risks(text):
+    return map_reduce(text, analyze_contract_section, CONTRACT_PLACEHOLDERS)
+
+def stream_analysis(section, full, text):
+    # Long documents are merged after the map step, so they arrive as one event
+    if estimate_tokens(text) <= SECTION_TOKENS:
+        yield from section(text, stream=True)
+    else:
+        yield full(text)
 
+def analyze_bid_section(text, stream=False):
     prompt = f"""You are an expert bid analyzer. Please analyze this bid document text and provide a structured analysis:
 
 {text}
@@ -87,17 +322,11 @@ ELIGIBILITY FLAGS:
 - If none found, state "No eligibility issues identified"
 """
 
-    model = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.3)
-    response = model.invoke(prompt)
-    return response.content
-
-def analyze_checklist_requirements(text):
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY not found in environment variables")
-    
-    genai.configure(api_key=api_key)
+    if stream:
+        return stream_model("bid", text, prompt)
+    return invoke_model("bid", text, prompt)
 
+def analyze_checklist_section(text, stream=False):
     prompt = f"""You are an expert RFP analyst. Please analyze this document and provide a structured checklist of submission requirements:
 
 {text}
@@ -125,17 +354,11 @@ ADDITIONAL REQUIREMENTS:
 
 Please be specific and precise in listing each requirement."""
 
-    model = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.3)
-    response = model.invoke(prompt)
-    return response.content
-
-def analyze_contract_risks(text):
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY not found in environment variables")
-    
-    genai.configure(api_key=api_key)
+    if stream:
+        return stream_model("checklist", text, prompt)
+    return invoke_model("checklist", text, prompt)
 
+def analyze_contract_section(text, stream=False):
     prompt = f"""You are an expert contract analyzer. Please analyze this contract document and identify potential risks and biased clauses:
 
 {text}
@@ -167,23 +390,81 @@ ADDITIONAL RISKS:
 - If none found, state "No additional risks identified"
 """
 
-    model = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.3)
-    response = model.invoke(prompt)
-    return response.content
+    if stream:
+        return stream_model("contract", text, prompt)
+    return invoke_model("contract", text, prompt)
+
+def amendment_report(previous_doc_id, doc_id):
+    # Pages are compared on cleaned text, cache carry-over on the text the analysis prompts actually see
+    return diff_versions(
+        document_store.get_text(previous_doc_id, clean=True),
+        document_store.get_text(doc_id, clean=True),
+        document_store.get_text(previous_doc_id, STRIP_BOILERPLATE),
+        document_store.get_text(doc_id, STRIP_BOILERPLATE),
+    )
 
-@app.route('/ask', methods=['POST'])
-def ask_question():
+@app.route('/documents', methods=['POST'])
+def upload_document():
     try:
         if 'pdf' not in request.files:
             return jsonify({"error": "No PDF file provided"}), 400
         
-        pdf_file = request.files['pdf']
-        question = request.form.get('question')
+        doc_id, text = document_store.add(request.files['pdf'].read(), STRIP_BOILERPLATE)
+        result = {
+            "doc_id": doc_id,
+            "characters": len(text),
+            "boilerplate": document_store.get_report(doc_id)
+        }
+        
+        # An amendment: report which pages changed and how much cached analysis carries over
+        previous_doc_id = request_value('previous_doc_id')
+        if previous_doc_id:
+            if not document_store.exists(previous_doc_id):
+                return jsonify({"error": "Unknown previous_doc_id"}), 404
+            result["amendment"] = amendment_report(previous_doc_id, doc_id)
+        
+        return jsonify(result), 201
         
+    except Exception as e:
+        return error_response(e)
+
+@app.route('/documents/<doc_id>', methods=['GET'])
+def get_document(doc_id):
+    if not document_store.exists(doc_id):
+        return jsonify({"error": "Unknown doc_id"}), 404
+    return jsonify({
+        "doc_id": doc_id,
+        "boilerplate": document_store.get_report(doc_id)
+    })
+
+@app.route('/documents/<doc_id>/diff/<previous_doc_id>', methods=['GET'])
+def diff_document(doc_id, previous_doc_id):
+    if not document_store.exists(doc_id) or not document_store.exists(previous_doc_id):
+        return jsonify({"error": "Unknown doc_id"}), 404
+    return jsonify(amendment_report(previous_doc_id, doc_id))
+
+@app.route('/documents/<doc_id>', methods=['DELETE'])
+def delete_document(doc_id):
+    if not document_store.delete(doc_id):
+        return jsonify({"error": "Unknown doc_id"}), 404
+    return jsonify({"deleted": doc_id})
+
+@app.route('/ask', methods=['POST'])
+def ask_question():
+    try:
+        doc_id, text = load_document()
+        if doc_id is None:
+            return jsonify({"error": "No PDF file or doc_id provided"}), 400
+        if text is None:
+            return jsonify({"error": "Unknown doc_id"}), 404
+        
+        question = request_value('question')
         if not question:
             return jsonify({"error": "No question provided"}), 400
         
-        vector_store = process_pdf(pdf_file)
+        vector_store = get_vector_store(doc_id, text)
+        if wants_stream():
+            return sse_response(get_answer(vector_store, question, stream=True), question=question)
         answer = get_answer(vector_store, question)
         
         return jsonify({
@@ -192,20 +473,22 @@ def ask_question():
         })
         
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return error_response(e)
 
 @app.route('/summary', methods=['POST'])
 def generate_summary():
     try:
-        if 'pdf' not in request.files:
-            return jsonify({"error": "No PDF file provided"}), 400
+        if wants_async():
+            return enqueue_analysis("summary", lambda text: {"summary": analyze_bid_requirements(text)})
+        
+        doc_id, text = load_document()
+        if doc_id is None:
+            return jsonify({"error": "No PDF file or doc_id provided"}), 400
+        if text is None:
+            return jsonify({"error": "Unknown doc_id"}), 404
         
-        pdf_file = request.files['pdf']
-        # Extract text from PDF
-        pdf_reader = PdfReader(BytesIO(pdf_file.read()))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text()
+        if wants_stream():
+            return sse_response(stream_analysis(analyze_bid_section, analyze_bid_requirements, text))
         
         # Generate analysis
         analysis = analyze_bid_requirements(text)
@@ -215,20 +498,22 @@ def generate_summary():
         })
         
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return error_response(e)
 
 @app.route('/checklist', methods=['POST'])
 def generate_checklist():
     try:
-        if 'pdf' not in request.files:
-            return jsonify({"error": "No PDF file provided"}), 400
+        if wants_async():
+            return enqueue_analysis("checklist", lambda text: {"checklist": analyze_checklist_requirements(text)})
         
-        pdf_file = request.files['pdf']
-        # Extract text from PDF
-        pdf_reader = PdfReader(BytesIO(pdf_file.read()))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text()
+        doc_id, text = load_document()
+        if doc_id is None:
+            return jsonify({"error": "No PDF file or doc_id provided"}), 400
+        if text is None:
+            return jsonify({"error": "Unknown doc_id"}), 404
+        
+        if wants_stream():
+            return sse_response(stream_analysis(analyze_checklist_section, analyze_checklist_requirements, text))
         
         # Generate checklist
         checklist = analyze_checklist_requirements(text)
@@ -238,20 +523,22 @@ def generate_checklist():
         })
         
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return error_response(e)
 
 @app.route('/contract', methods=['POST'])
 def analyze_contract():
     try:
-        if 'pdf' not in request.files:
-            return jsonify({"error": "No PDF file provided"}), 400
+        if wants_async():
+            return enqueue_analysis("contract", lambda text: {"risks": analyze_contract_risks(text)})
         
-        pdf_file = request.files['pdf']
-        # Extract text from PDF
-        pdf_reader = PdfReader(BytesIO(pdf_file.read()))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text()
+        doc_id, text = load_document()
+        if doc_id is None:
+            return jsonify({"error": "No PDF file or doc_id provided"}), 400
+        if text is None:
+            return jsonify({"error": "Unknown doc_id"}), 404
+        
+        if wants_stream():
+            return sse_response(stream_analysis(analyze_contract_section, analyze_contract_risks, text))
         
         # Generate analysis
         analysis = analyze_contract_risks(text)
@@ -261,7 +548,7 @@ def analyze_contract():
         })
         
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return error_response(e)
 
 @app.route('/chat', methods=['POST'])
 def chat():
@@ -272,19 +559,18 @@ def chat():
         
         question = data['question']
         
-        # Initialize Gemini model for general chat
-        model = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.3)
+        if wants_stream():
+            return sse_response(stream_model("chat", question, question), question=question)
         
-        # Get response from model
-        response = model.invoke(question)
+        answer = invoke_model("chat", question, question)
         
         return jsonify({
             "question": question,
-            "answer": response.content
+            "answer": answer
         })
         
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return error_response(e)
 
 COMPANY_PROFILE = {
     "Company Length of Existence": "9 years",
@@ -308,60 +594,350 @@ COMPANY_PROFILE = {
     "MBE Certification": "NO"
 }
 
-@app.route('/verify', methods=['POST'])
-def verify_rfp():
-    try:
-        if 'pdf' not in request.files:
-            return jsonify({"error": "No PDF file provided"}), 400
-        
-        pdf_file = request.files['pdf']
-        pdf_reader = PdfReader(BytesIO(pdf_file.read()))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text()
-        
-        # Create a structured prompt with the company profile and RFP text
-        prompt = f"""
-        Compare the RFP requirements with the following company profile JSON data:
+DEFAULT_PROFILE_ID = "default"
+VERIFY_TOP_K = int(os.getenv("VERIFY_TOP_K", 3))
+profile_store.register(DEFAULT_PROFILE_ID, "Default", COMPANY_PROFILE)
 
-RFP Document:
-{text}
+def verify_against_profile(text, stream=False, profile_id=DEFAULT_PROFILE_ID):
+    entry = profile_store.get(profile_id)
+    report = evaluate_requirements(extract_requirements(text), entry["normalized"])
+    return verify_report(report, entry["profile"], stream)
 
-Company Profile:
-{json.dumps(COMPANY_PROFILE, indent=2)}
+def verify_report(report, profile, stream=False):
+    # Years, NAICS, registrations, insurance and licenses are settled by rules; only the rest reach the model
+    metrics.verification_checks_total.inc(len(report["findings"]), source="rules")
+    if not report["unresolved"]:
+        result = render_report(report)
+        return iter([result]) if stream else result
+    metrics.verification_checks_total.inc(len(report["unresolved"]), source="llm")
+    metrics.verification_checks_total.inc(report["unresolved_dropped"], source="dropped")
 
-Please evaluate based on these criteria:
-1. Years of Experience:
-- Required years vs Current Experience: {COMPANY_PROFILE['Years of Experience in Temporary Staffing']}
-- Company Existence: {COMPANY_PROFILE['Company Length of Existence']}
+    settled = format_findings(report["findings"]) or "- None"
+    requirements = "\n".join(f"- {sentence}" for sentence in report["unresolved"])
+    prompt = f"""
+    Decide whether the company meets the remaining RFP requirements below, using the company profile JSON data.
 
-2. Service Categories:
-- Available Services: {COMPANY_PROFILE['Services Provided']}
-- Compare with RFP requirements
+Already Checked Against The Profile (treat as final):
+{settled}
+
+Remaining RFP Requirements:
+{requirements}
+
+Company Profile:
+{json.dumps(profile, indent=2)}
 
-3. Compliance & Documentation:
-- Insurance: {COMPANY_PROFILE['Certificate of Insurance']}
-- Licenses: {COMPANY_PROFILE['Licenses']}
-- Registrations: DUNS({COMPANY_PROFILE['DUNS Number']}), CAGE({COMPANY_PROFILE['CAGE Code']})
+Ignore requirements that describe how the contract is performed rather than who may bid.
+Any NOT MET check above makes the company NOT ELIGIBLE.
 
 Output Format:
 ELIGIBILITY STATUS: [ELIGIBLE/NOT ELIGIBLE]
 
 Details:
-[List key matches and gaps]
+[List the already checked items, then key matches and gaps from the remaining requirements]
 
 Summary:
 [Brief eligibility conclusion]
 
 """
 
-        model = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.3)
-        response = model.invoke(prompt)
+    content = settled + requirements + json.dumps(profile)
+    dropped = format_dropped(report)
+    if stream:
+        return itertools.chain(stream_model("verify", content, prompt), [dropped])
+    return invoke_model("verify", content, prompt) + dropped
+
+def verify_profiles(text, top_k=VERIFY_TOP_K, profile_ids=None):
+    # Requirements are extracted once; rules and embedding similarity then score every profile together
+    requirements = extract_requirements(text)
+    entries = [profile_store.get(profile_id) for profile_id in profile_ids] if profile_ids else [
+        profile_store.get(profile["id"]) for profile in profile_store.list()
+    ]
+    sentences = list(dict.fromkeys([check["source"] for check in requirements["checks"]] + requirements["unresolved"]))
+    scores = profile_store.similarity(sentences)
+
+    candidates = []
+    for entry in entries:
+        report = evaluate_requirements(requirements, entry["normalized"])
+        candidates.append({
+            "profile_id": entry["id"],
+            "name": entry["name"],
+            "score": round(scores.get(entry["id"], 0.0), 4),
+            "rules_failed": sum(finding["status"] == NOT_MET for finding in report["findings"]),
+            "findings": [{"status": finding["status"], "detail": finding["detail"]} for finding in report["findings"]],
+            "report": report,
+        })
+    candidates.sort(key=lambda candidate: (candidate["rules_failed"], -candidate["score"]))
+
+    # A failed rule already decides eligibility, so only clean profiles are worth a model call
+    shortlisted = [candidate for candidate in candidates if not candidate["rules_failed"]][:top_k]
+    if shortlisted:
+        with ThreadPoolExecutor(max_workers=len(shortlisted)) as pool:
+            futures = [
+                run_in_context(pool, verify_report, candidate["report"], profile_store.get(candidate["profile_id"])["profile"])
+                for candidate in shortlisted
+            ]
+            for candidate, future in zip(shortlisted, futures):
+                candidate["verification"] = future.result()
+    for candidate in candidates:
+        report = candidate.pop("report")
+        if "verification" not in candidate:
+            candidate["verification"] = render_report(report) if candidate["rules_failed"] else None
+    return {
+        "candidates": candidates,
+        "unresolved_requirements": len(requirements["unresolved"]),
+        "unresolved_dropped": requirements["unresolved_dropped"],
+    }
+
+@app.route('/verify', methods=['POST'])
+def verify_rfp():
+    try:
+        profile_id = request_value('profile_id') or DEFAULT_PROFILE_ID
+        if profile_store.get(profile_id) is None:
+            return jsonify({"error": "Unknown profile_id"}), 404
+        
+        if wants_async():
+            return enqueue_analysis("verify", lambda text: verify_against_profile(text, profile_id=profile_id))
+        
+        doc_id, text = load_document()
+        if doc_id is None:
+            return jsonify({"error": "No PDF file or doc_id provided"}), 400
+        if text is None:
+            return jsonify({"error": "Unknown doc_id"}), 404
+        
+        if wants_stream():
+            return sse_response(verify_against_profile(text, stream=True, profile_id=profile_id))
+        
+        verification = verify_against_profile(text, profile_id=profile_id)
+        
+        return jsonify(verification)
+        
+    except Exception as e:
+        return error_response(e)
+
+@app.route('/verify/batch', methods=['POST'])
+def verify_rfp_batch():
+    try:
+        profile_ids = request_value('profile_ids')
+        if isinstance(profile_ids, str):
+            profile_ids = [profile_id.strip() for profile_id in profile_ids.split(',') if profile_id.strip()]
+        if profile_ids is not None and not (
+                isinstance(profile_ids, list) and all(isinstance(profile_id, str) for profile_id in profile_ids)):
+            return jsonify({"error": "profile_ids must be a string or a list of strings"}), 400
+        unknown = [profile_id for profile_id in profile_ids or [] if profile_store.get(profile_id) is None]
+        if unknown:
+            return jsonify({"error": f"Unknown profile_id: {', '.join(unknown)}"}), 404
+        top_k = request_value('top_k')
+        try:
+            # 0 is a valid top_k, so only a missing value falls back to the default
+            top_k = VERIFY_TOP_K if top_k in (None, '') else int(top_k)
+        except (TypeError, ValueError):
+            top_k = -1
+        if top_k < 0:
+            return jsonify({"error": "top_k must be a non-negative integer"}), 400
+        
+        if wants_async():
+            return enqueue_analysis("verify_batch", lambda text: verify_profiles(text, top_k, profile_ids))
+        
+        doc_id, text = load_document()
+        if doc_id is None:
+            return jsonify({"error": "No PDF file or doc_id provided"}), 400
+        if text is None:
+            return jsonify({"error": "Unknown doc_id"}), 404
+        
+        return jsonify(verify_profiles(text, top_k, profile_ids))
+        
+    except Exception as e:
+        return error_response(e)
+
+@app.route('/profiles', methods=['GET'])
+def list_profiles():
+    return jsonify({"profiles": profile_store.list()})
+
+@app.route('/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    entry = profile_store.get(profile_id)
+    if entry is None:
+        return jsonify({"error": "Unknown profile_id"}), 404
+    return jsonify({"id": entry["id"], "name": entry["name"], "profile": entry["profile"]})
+
+@app.route('/profiles/<profile_id>', methods=['PUT'])
+def put_profile(profile_id):
+    if not is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    body = request.get_json(silent=True) or {}
+    if not isinstance(body.get("profile"), dict):
+        return jsonify({"error": "Body must be JSON with a 'profile' object"}), 400
+    try:
+        profile_store.put(profile_id, body.get("name") or profile_id, body["profile"])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"id": profile_id, "name": body.get("name") or profile_id})
+
+@app.route('/profiles/<profile_id>', methods=['DELETE'])
+def delete_profile(profile_id):
+    if not is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    if profile_id == DEFAULT_PROFILE_ID or not profile_store.delete(profile_id):
+        return jsonify({"error": "Unknown profile_id"}), 404
+    return jsonify({"deleted": profile_id})
+
+ANALYSES = {
+    "summary": analyze_bid_requirements,
+    "checklist": analyze_checklist_requirements,
+    "risks": analyze_contract_risks,
+    "verification": verify_against_profile,
+}
+
+def run_analyses(text):
+    # Yields (name, result, error) in completion order
+    with ThreadPoolExecutor(max_workers=len(ANALYSES)) as pool:
+        futures = {run_in_context(pool, analysis, text): name for name, analysis in ANALYSES.items()}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, str(e)
+
+@app.route('/analyze', methods=['POST'])
+def analyze_document():
+    try:
+        doc_id, text = load_document()
+        if doc_id is None:
+            return jsonify({"error": "No PDF file or doc_id provided"}), 400
+        if text is None:
+            return jsonify({"error": "Unknown doc_id"}), 404
+        
+        if request.args.get('stream'):
+            def generate():
+                for name, result, error in run_analyses(text):
+                    yield json.dumps({"analysis": name, "result": result, "error": error}) + "\n"
+            return Response(generate(), mimetype='application/x-ndjson')
+        
+        results = {"doc_id": doc_id}
+        errors = {}
+        for name, result, error in run_analyses(text):
+            results[name] = result
+            if error:
+                errors[name] = error
+        if errors:
+            results["errors"] = errors
         
-        return jsonify(response.content)
+        return jsonify(results)
         
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return error_response(e)
+
+BATCH_DIR = os.getenv("BATCH_DIR", "batches")
+# One running job per batch_id: two jobs would redo the same documents and interleave their records
+batch_jobs = {}
+batch_jobs_lock = threading.Lock()
+
+@app.route('/batch', methods=['POST'])
+def start_batch():
+    # A ZIP of PDFs runs as one background job; uploading the same ZIP again resumes it
+    if 'zip' not in request.files:
+        return jsonify({"error": "No ZIP file provided"}), 400
+    archive = request.files['zip'].read()
+    batch_id = document_hash(archive)
+    os.makedirs(BATCH_DIR, exist_ok=True)
+    archive_path = os.path.join(BATCH_DIR, f"{batch_id}.zip")
+    if not os.path.exists(archive_path):
+        tmp_path = f"{archive_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(archive)
+        os.replace(tmp_path, archive_path)
+    if not zipfile.is_zipfile(archive_path):
+        os.remove(archive_path)
+        return jsonify({"error": "Upload is not a ZIP archive"}), 400
+    
+    names = request_value('analyses')
+    if isinstance(names, str):
+        names = [name.strip() for name in names.split(',') if name.strip()]
+    unknown = [name for name in names or [] if name not in ANALYSES]
+    if unknown:
+        return jsonify({"error": f"Unknown analyses: {', '.join(unknown)}"}), 400
+    analyses = {name: ANALYSES[name] for name in names} if names else ANALYSES
+    
+    output_path = os.path.join(BATCH_DIR, f"{batch_id}.jsonl")
+    with batch_jobs_lock:
+        job = batch_jobs.get(batch_id)
+        # A cancelled job keeps running until its current work returns, so wait for the future itself
+        if job is None or job.future.done():
+            cancel_event = threading.Event()
+            job = job_queue.submit("batch", lambda: run_batch(
+                archive_path, output_path, analyses, STRIP_BOILERPLATE, cancelled=cancel_event.is_set
+            ), cancel_event)
+            batch_jobs[batch_id] = job
+    return jsonify({"batch_id": batch_id, **job.to_dict()}), 202, {"Location": f"/jobs/{job.id}"}
+
+@app.route('/batch/<batch_id>', methods=['GET'])
+def get_batch_results(batch_id):
+    # Results written so far, one JSON object per document
+    output_path = os.path.join(BATCH_DIR, f"{batch_id}.jsonl")
+    if not DOC_ID_PATTERN.match(batch_id) or not os.path.exists(output_path):
+        return jsonify({"error": "Unknown batch_id"}), 404
+    with open(output_path, encoding="utf-8") as f:
+        return Response(f.read(), mimetype='application/x-ndjson')
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job_id"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job_id"}), 404
+    if job.status == DONE:
+        return jsonify(job.result)
+    if job.status == FAILED:
+        return jsonify({"error": job.error}), 500
+    if job.status == CANCELLED:
+        return jsonify({"error": "Job was cancelled"}), 409
+    return jsonify(job.to_dict()), 202
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    job = job_queue.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job_id"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify({
+        "pdf_text": text_cache.stats(),
+        "vector_store": vector_cache.stats(),
+        "llm": llm_cache.stats(),
+        "rate_limit": rate_limiter.stats()
+    })
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    cache_lines = [
+        "# HELP rfp_cache_hits_total Cache hits by cache",
+        "# TYPE rfp_cache_hits_total counter",
+    ]
+    caches = {"pdf_text": text_cache.stats(), "vector_store": vector_cache.stats(), "llm": llm_cache.stats()}
+    for name, stats in caches.items():
+        cache_lines.append(f'rfp_cache_hits_total{{cache="{name}"}} {stats["hits"] + stats.get("disk_hits", 0)}')
+    cache_lines += [
+        "# HELP rfp_cache_misses_total Cache misses by cache",
+        "# TYPE rfp_cache_misses_total counter",
+    ]
+    for name, stats in caches.items():
+        cache_lines.append(f'rfp_cache_misses_total{{cache="{name}"}} {stats["misses"]}')
+    return Response(metrics.render(cache_lines), mimetype='text/plain; version=0.0.4')
+
+@app.route('/cache/llm', methods=['DELETE'])
+def purge_llm_cache():
+    if not is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    removed = llm_cache.purge(request.args.get('template'))
+    return jsonify({"purged": removed})
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -14,6 +14,7 @@ import {
   PaperAirplaneIcon,
   StopIcon,
 } from "@heroicons/react/24/outline";
+import { documentForm } from "@/lib/documents";
 
 interface Message {
   text: string;
@@ -104,11 +105,10 @@ export default function ChatScreen() {
   };
 
   const sendPdfQuestion = async (file: File, question: string) => {
-    const formData = new FormData();
-    formData.append("pdf", file);
-    formData.append("question", question);
-
     try {
+      const formData = await documentForm(file);
+      formData.append("question", question);
+
       const response = await fetch("http://localhost:5000/ask", {
         method: "POST",
         body: formData,
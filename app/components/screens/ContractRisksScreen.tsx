@@ -1,4 +1,5 @@
 import React, { useState } from "react";
+import { documentForm } from "@/lib/documents";
 
 const ReportView: React.FC<{ content: string }> = ({ content }) => {
   const formatContent = (text: string) => {
@@ -85,8 +86,7 @@ const ContractRisksScreen: React.FC = () => {
 
     setLoading(true);
     try {
-      const formData = new FormData();
-      formData.append("pdf", pdfFile);
+      const formData = await documentForm(pdfFile);
 
       const response = await fetch("http://localhost:5000/contract", {
         method: "POST",
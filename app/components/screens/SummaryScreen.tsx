@@ -1,4 +1,5 @@
 import React, { useState } from "react";
+import { documentForm } from "@/lib/documents";
 
 const ReportView: React.FC<{ content: string }> = ({ content }) => {
   const formatContent = (text: string) => {
@@ -71,8 +72,7 @@ const SummaryScreen: React.FC = () => {
 
     setLoading(true);
     try {
-      const formData = new FormData();
-      formData.append("pdf", pdfFile);
+      const formData = await documentForm(pdfFile);
 
       const response = await fetch("http://localhost:5000/summary", {
         method: "POST",
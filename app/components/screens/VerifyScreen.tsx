@@ -1,5 +1,6 @@
 "use client";
 import { useState } from "react";
+import { documentForm } from "@/lib/documents";
 
 export default function VerifyScreen() {
   const [pdfFile, setPdfFile] = useState<File | null>(null);
@@ -26,8 +27,7 @@ export default function VerifyScreen() {
 
     setLoading(true);
     try {
-      const formData = new FormData();
-      formData.append("pdf", pdfFile);
+      const formData = await documentForm(pdfFile);
 
       const response = await fetch("http://localhost:5000/verify", {
         method: "POST",
@@ -0,0 +1,236 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+WORDS = (
+    "contractor shall provide temporary staffing services including administrative "
+    "clerical legal credentialing support personnel proposal submission deadline "
+    "NAICS code 561320 CAGE DUNS insurance certificate license years experience "
+    "page limit font margin attachment signature agency evaluation award pricing "
+    "termination indemnification liability notice period compliance requirement"
+).split()
+
+QUESTIONS = [
+    "What is the proposal due date?",
+    "What NAICS code applies to this solicitation?",
+    "What insurance is required?",
+    "How many years of experience are required?",
+]
+
+
+def _pdf_escape(line):
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages, lines_per_page=45, seed=0):
+    # Minimal hand-written PDF so the benchmark needs no PDF writer dependency
+    rng = random.Random(seed)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for page_number in range(pages):
+        lines = [f"Solicitation RFP-2024-001    Page {page_number + 1}"]
+        lines += [" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(lines_per_page)]
+        body = "BT /F1 9 Tf 12 TL 40 800 Td " + " ".join(f"({_pdf_escape(line)}) Tj T*" for line in lines) + " ET"
+        stream = body.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, obj))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def measure(fn, iterations, concurrency=1, setup=None):
+    samples = []
+
+    def run_once(i):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        result = fn(i)
+        elapsed = time.perf_counter() - start
+        # A route that starts failing fast must not look like a speed-up
+        status = getattr(result, "status_code", None)
+        if status is not None and status >= 400:
+            raise RuntimeError(f"HTTP {status}: {result.get_data(as_text=True)[:200]}")
+        return elapsed
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(run_once, range(iterations)))
+    else:
+        samples = [run_once(i) for i in range(iterations)]
+    wall = time.perf_counter() - started
+    return {
+        "iterations": iterations,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "mean_ms": sum(samples) / len(samples) * 1000,
+        "rps": iterations / wall if wall else 0.0,
+    }
+
+
+def configure_environment(args):
+    # Must run before app is imported: the caches read their settings at import time
+    workdir = tempfile.mkdtemp(prefix="rfp-bench-")
+    if not args.live:
+        os.environ["LLM_BACKEND"] = "fake"
+        os.environ.setdefault("FAKE_LLM_FIRST_TOKEN_MS", str(args.llm_latency_ms))
+        os.environ.setdefault("FAKE_EMBEDDING_MS", str(args.embedding_latency_ms))
+        # The fake backend has no quota; measure the code, not the rate limiter
+        os.environ.setdefault("LLM_REQUESTS_PER_MINUTE", "1000000000")
+        os.environ.setdefault("LLM_TOKENS_PER_MINUTE", "1000000000000")
+        os.environ.setdefault("LLM_MAX_CONCURRENCY", "1000")
+    os.environ["PROFILE_STORE_DIR"] = os.path.join(workdir, "profiles")
+    os.environ["LLM_CACHE_PATH"] = os.path.join(workdir, "llm.sqlite3")
+    os.environ["DOCUMENT_STORE_DIR"] = os.path.join(workdir, "documents")
+    os.environ["VECTOR_CACHE_DIR"] = ""
+    os.environ["PDF_CACHE_DIR"] = ""
+    # Cold runs must pay for every embedding, so the embedding cache is disabled outright
+    os.environ["EMBEDDING_CACHE_PATH"] = "" if args.cold else os.path.join(workdir, "embeddings.sqlite3")
+
+
+def run_suite(args):
+    import app as server
+    from pdf_cache import parse_pdf_text, text_cache
+    from vector_cache import vector_cache
+    from llm_cache import llm_cache
+    from chunking import split_tokens
+
+    def reset_caches():
+        text_cache.clear()
+        vector_cache.clear()
+        llm_cache.purge()
+
+    setup = reset_caches if args.cold else None
+    documents = {}
+    if os.path.exists(args.demo_pdf):
+        with open(args.demo_pdf, "rb") as f:
+            documents["demo"] = f.read()
+    for pages in args.pages:
+        documents[f"synthetic-{pages}p"] = make_pdf(pages, seed=pages)
+
+    client = server.app.test_client()
+    embeddings = server.get_embeddings()
+    results = {}
+
+    for name, pdf_bytes in documents.items():
+        text = parse_pdf_text(pdf_bytes)
+        vector_store = server.build_vector_store(text, embeddings)
+        doc_id = client.post("/documents", data={"pdf": (BytesIO(pdf_bytes), f"{name}.pdf")}).get_json()["doc_id"]
+
+        stages = {
+            "extract": lambda i: parse_pdf_text(pdf_bytes),
+            "chunk": lambda i: split_tokens(text),
+            "index": lambda i: server.build_vector_store(text, embeddings),
+            "retrieve": lambda i: vector_store.similarity_search(QUESTIONS[i % len(QUESTIONS)]),
+            "process_pdf": lambda i: server.process_pdf(BytesIO(pdf_bytes)),
+            "get_answer": lambda i: server.get_answer(vector_store, QUESTIONS[i % len(QUESTIONS)]),
+        }
+        for route in ("summary", "checklist", "contract", "verify", "analyze"):
+            stages[f"route:/{route}"] = lambda i, route=route: client.post(f"/{route}", data={"doc_id": doc_id})
+        stages["route:/ask"] = lambda i: client.post(
+            "/ask", data={"doc_id": doc_id, "question": QUESTIONS[i % len(QUESTIONS)]}
+        )
+        stages["route:/documents"] = lambda i: client.post(
+            "/documents", data={"pdf": (BytesIO(pdf_bytes), f"{name}.pdf")}
+        )
+
+        for stage, fn in stages.items():
+            if args.only and not any(token in stage for token in args.only):
+                continue
+            concurrency = args.concurrency if stage.startswith("route:") else 1
+            results[f"{stage} [{name}]"] = measure(fn, args.iterations, concurrency, setup)
+
+    stage = "route:/chat"
+    if not args.only or any(token in stage for token in args.only):
+        results[stage] = measure(
+            lambda i: client.post("/chat", json={"question": QUESTIONS[i % len(QUESTIONS)]}),
+            args.iterations, args.concurrency, setup,
+        )
+    return results
+
+
+def print_table(results):
+    print(f"{'benchmark':<48} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9}")
+    for name, row in results.items():
+        print(f"{name:<48} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['rps']:>9.1f}")
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, row in results.items():
+        previous = baseline.get(name)
+        if previous and row["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']:.2f} ms -> {row['p95_ms']:.2f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the RFP analysis backend without live Gemini calls")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1, help="parallel clients for route benchmarks")
+    parser.add_argument("--pages", type=int, nargs="*", default=[50, 300], help="synthetic PDF sizes")
+    parser.add_argument("--demo-pdf", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "demo.pdf"))
+    parser.add_argument("--cold", action="store_true", help="clear all caches before every iteration")
+    parser.add_argument("--only", nargs="*", help="run only benchmarks whose name contains one of these")
+    parser.add_argument("--live", action="store_true", help="use the real Gemini backend")
+    parser.add_argument("--llm-latency-ms", type=float, default=0)
+    parser.add_argument("--embedding-latency-ms", type=float, default=0)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="fail if p95 regresses against this results file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    configure_environment(args)
+    results = run_suite(args)
+    print_table(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            print("\n".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import os
+import re
+from chunking import count_tokens
+
+# A line is boilerplate when it shows up on at least this share of pages
+MIN_PAGE_FRACTION = float(os.getenv("BOILERPLATE_MIN_PAGE_FRACTION", 0.5))
+MIN_PAGES = 3
+# Headers, footers and page numbers are only looked for in this many lines at the top and bottom of a page
+EDGE_LINES = int(os.getenv("BOILERPLATE_EDGE_LINES", 3))
+
+# "Page 3", "Page 3 of 40", "3 of 40", "- 3 -"; a bare "3" also needs to follow the page sequence
+PAGE_LABEL_PATTERN = re.compile(r"^page\s*\d+(\s*(of|/)\s*\d+)?$|^\d+\s*(of|/)\s*\d+$|^-\s*\d+\s*-$", re.IGNORECASE)
+BARE_NUMBER_PATTERN = re.compile(r"^\d{1,4}$")
+# Extractors that return a page as one line hide headers and footers inside it; look for a repeated
+# run of words at the start and end of each page instead, at least this long so one common word never counts
+MIN_SPAN_WORDS = 3
+MAX_SPAN_WORDS = 40
+WORD_PATTERN = re.compile(r"\S+")
+SPACES_PATTERN = re.compile(r"[ \t ]+")
+BLANK_LINES_PATTERN = re.compile(r"\n{3,}")
+PAGE_BREAK = "\f"
+
+
+def _normalize(line):
+    return SPACES_PATTERN.sub(" ", line).strip()
+
+
+def _signature(line):
+    # Digits vary per page ("Page 3 of 40", dated footers), so they don't count
+    return re.sub(r"\d+", "#", line.lower())
+
+
+def _edge_lines(page):
+    # (position, line) for the first and last EDGE_LINES non-empty lines; body text is never a candidate
+    lines = [(position, _normalize(line)) for position, line in enumerate(page.splitlines()) if line.strip()]
+    if len(lines) <= 2 * EDGE_LINES:
+        return lines
+    return lines[:EDGE_LINES] + lines[-EDGE_LINES:]
+
+
+def repeated_signatures(pages):
+    if len(pages) < MIN_PAGES:
+        return set()
+    page_counts = {}
+    for page in pages:
+        # Bare numbers are left to page_number_offset; as "#" they would all look repeated
+        for signature in {_signature(line) for _, line in _edge_lines(page) if not BARE_NUMBER_PATTERN.match(line)}:
+            page_counts[signature] = page_counts.get(signature, 0) + 1
+    threshold = max(MIN_PAGES, MIN_PAGE_FRACTION * len(pages))
+    return {signature for signature, count in page_counts.items() if count >= threshold}
+
+
+def page_number_offset(pages):
+    # A bare number is a page number when number - page index is the same on enough pages;
+    # table cells, years and codes don't line up with the page sequence
+    if len(pages) < MIN_PAGES:
+        return None
+    offsets = {}
+    for index, page in enumerate(pages):
+        for offset in {int(line) - index for _, line in _edge_lines(page) if BARE_NUMBER_PATTERN.match(line)}:
+            offsets[offset] = offsets.get(offset, 0) + 1
+    threshold = max(MIN_PAGES, MIN_PAGE_FRACTION * len(pages))
+    offset, count = max(offsets.items(), key=lambda item: item[1], default=(None, 0))
+    return offset if count >= threshold else None
+
+
+def _repeated_span(pages, from_end):
+    # Longest run of leading (or trailing) words, digits masked, that enough pages share
+    threshold = max(MIN_PAGES, MIN_PAGE_FRACTION * len(pages))
+    words = [[_signature(word) for word in WORD_PATTERN.findall(page)] for page in pages]
+    if from_end:
+        words = [list(reversed(page_words)) for page_words in words]
+    span = ()
+    for length in range(1, MAX_SPAN_WORDS + 1):
+        counts = {}
+        for page_words in words:
+            if len(page_words) >= length:
+                head = tuple(page_words[:length])
+                counts[head] = counts.get(head, 0) + 1
+        head, count = max(counts.items(), key=lambda item: item[1], default=((), 0))
+        # Only extend the span found so far; a different run that is common at this length is not the same header
+        if count < threshold or head[:-1] != span:
+            break
+        span = head
+    return span if len(span) >= MIN_SPAN_WORDS else ()
+
+
+def strip_repeated_spans(pages):
+    if len(pages) < MIN_PAGES:
+        return pages, 0
+    prefix = _repeated_span(pages, from_end=False)
+    suffix = _repeated_span(pages, from_end=True)
+    stripped, removed = [], 0
+    for page in pages:
+        words = list(WORD_PATTERN.finditer(page))
+        start, end = 0, len(page)
+        if prefix and len(words) >= len(prefix) and tuple(_signature(match.group()) for match in words[:len(prefix)]) == prefix:
+            start = words[len(prefix) - 1].end()
+            removed += 1
+        tail = words[-len(suffix):] if suffix else []
+        if suffix and len(words) >= len(prefix if start else ()) + len(suffix) and \
+                tuple(_signature(match.group()) for match in reversed(tail)) == suffix and tail[0].start() >= start:
+            end = tail[0].start()
+            removed += 1
+        stripped.append(page[start:end].strip())
+    return stripped, removed
+
+
+def split_pages(text):
+    return text.split(PAGE_BREAK)
+
+
+def strip_boilerplate(pages):
+    repeated = repeated_signatures(pages)
+    offset = page_number_offset(pages)
+    cleaned_pages = []
+    removed_lines = 0
+    for index, page in enumerate(pages):
+        boilerplate = {
+            position for position, line in _edge_lines(page)
+            if _signature(line) in repeated
+            or PAGE_LABEL_PATTERN.match(line)
+            or (offset is not None and BARE_NUMBER_PATTERN.match(line) and int(line) - index == offset)
+        }
+        kept = []
+        for position, line in enumerate(page.splitlines()):
+            if position in boilerplate:
+                removed_lines += 1
+                continue
+            kept.append(_normalize(line))
+        cleaned_pages.append("\n".join(kept).strip())
+    cleaned_pages, removed_spans = strip_repeated_spans(cleaned_pages)
+
+    raw = "".join(pages)
+    # Pages stay separated by form feeds (as pdftotext does) so later stages can split on them
+    cleaned = PAGE_BREAK.join(BLANK_LINES_PATTERN.sub("\n\n", page) for page in cleaned_pages)
+    raw_tokens = count_tokens(raw)
+    cleaned_tokens = count_tokens(cleaned)
+    report = {
+        "pages": len(pages),
+        "repeated_lines": len(repeated),
+        "removed_lines": removed_lines,
+        "removed_spans": removed_spans,
+        "characters_before": len(raw),
+        "characters_after": len(cleaned),
+        "tokens_before": raw_tokens,
+        "tokens_after": cleaned_tokens,
+        "tokens_saved": raw_tokens - cleaned_tokens,
+    }
+    return cleaned, report
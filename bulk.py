@@ -0,0 +1,177 @@
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from document_store import document_store
+from pdf_cache import clean_key, document_hash, text_cache
+from pdf_extract import MAX_WORKERS, extract_pages
+
+try:
+    import fcntl
+except ImportError:
+    # No POSIX file locks (Windows): one batch per output file is then up to the caller
+    fcntl = None
+
+# Analyses in flight across the whole batch; map-reduce sections inside one analysis still fan out
+LLM_CONCURRENCY = int(os.getenv("BULK_LLM_CONCURRENCY", 4))
+OK = "ok"
+ERROR = "error"
+
+
+def iter_sources(source):
+    # Yields (name, read) for a directory, a ZIP archive or a manifest of paths (plain or JSON lines)
+    if os.path.isdir(source):
+        paths = glob.glob(os.path.join(source, "**", "*"), recursive=True)
+        for path in sorted(path for path in paths if path.lower().endswith(".pdf") and os.path.isfile(path)):
+            yield os.path.relpath(path, source), lambda path=path: _read(path)
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(".pdf"):
+                    yield info.filename, lambda info=info: archive.read(info)
+    else:
+        base_dir = os.path.dirname(os.path.abspath(source))
+        with open(source) as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                entry = json.loads(line) if line.startswith("{") else {"path": line}
+                path = os.path.join(base_dir, entry["path"])
+                yield entry.get("name") or entry["path"], lambda path=path: _read(path)
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def completed_documents(output_path):
+    # Finished documents from an earlier run; a line cut short by a crash is dropped and redone
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            data = data[:data.rfind(b"\n") + 1]
+    for line in data.splitlines():
+        record = json.loads(line)
+        if record["status"] == OK:
+            done.add(record["doc_id"])
+    return done
+
+
+def _analyze(name, doc_id, pdf_bytes, analyses, clean, extract_pool, llm_slots):
+    started = time.perf_counter()
+    record = {"source": name, "doc_id": doc_id}
+    try:
+        if text_cache.get(clean_key(doc_id) if clean else doc_id) is None:
+            pages = extract_pool.submit(extract_pages, pdf_bytes, 1).result()
+            text_cache.put_pages(doc_id, pages)
+        _, text = document_store.add(pdf_bytes, clean)
+
+        results, errors = {}, {}
+        for analysis_name, analysis in analyses.items():
+            with llm_slots:
+                try:
+                    results[analysis_name] = analysis(text)
+                except Exception as e:
+                    errors[analysis_name] = str(e)
+        record.update(status=ERROR if errors else OK, results=results)
+        if errors:
+            record["errors"] = errors
+    except Exception as e:
+        record.update(status=ERROR, error=str(e))
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def _lock_output(out):
+    # Held for the whole run: a second worker resuming the same batch would redo documents and interleave records
+    if fcntl is None:
+        return
+    try:
+        fcntl.flock(out.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        raise RuntimeError(f"{out.name} is already being written by another batch run")
+
+
+def run_batch(source, output_path, analyses, clean=True, extract_workers=None, llm_concurrency=LLM_CONCURRENCY,
+              on_record=None, cancelled=None):
+    summary = {"output": output_path, "processed": 0, "failed": 0, "skipped": 0, "cancelled": False}
+    extract_workers = extract_workers or MAX_WORKERS
+    # Enough document threads to keep both pools busy; each holds one PDF in memory
+    in_flight = extract_workers + llm_concurrency
+    llm_slots = threading.BoundedSemaphore(llm_concurrency)
+    seen = set()
+
+    with open(output_path, "a", encoding="utf-8") as out, \
+            ProcessPoolExecutor(max_workers=extract_workers) as extract_pool, \
+            ThreadPoolExecutor(max_workers=in_flight) as document_pool:
+        _lock_output(out)
+        done = completed_documents(output_path)
+        pending = set()
+
+        def write_finished(block):
+            if block:
+                finished = wait(pending, return_when=FIRST_COMPLETED).done
+            else:
+                finished = [future for future in pending if future.done()]
+            for future in finished:
+                pending.discard(future)
+                record = future.result()
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                summary["processed" if record["status"] == OK else "failed"] += 1
+                if on_record:
+                    on_record(record)
+
+        for name, read in iter_sources(source):
+            # Documents already submitted still finish and get their records; nothing new starts
+            if cancelled and cancelled():
+                summary["cancelled"] = True
+                break
+            pdf_bytes = read()
+            doc_id = document_hash(pdf_bytes)
+            if doc_id in done or doc_id in seen:
+                summary["skipped"] += 1
+                continue
+            seen.add(doc_id)
+            while len(pending) >= in_flight:
+                write_finished(block=True)
+            pending.add(document_pool.submit(
+                _analyze, name, doc_id, pdf_bytes, analyses, clean, extract_pool, llm_slots))
+            write_finished(block=False)
+        while pending:
+            write_finished(block=True)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze a directory, ZIP archive or manifest of RFP PDFs into JSONL")
+    parser.add_argument("source", help="directory, .zip file, or manifest with one path (or JSON object) per line")
+    parser.add_argument("--output", default="batch_results.jsonl", help="JSONL file; re-running resumes where it stopped")
+    parser.add_argument("--analyses", nargs="*", help="subset of: summary checklist risks verification")
+    parser.add_argument("--extract-workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--llm-concurrency", type=int, default=LLM_CONCURRENCY)
+    args = parser.parse_args()
+
+    from app import ANALYSES, STRIP_BOILERPLATE
+    analyses = {name: ANALYSES[name] for name in args.analyses} if args.analyses else ANALYSES
+
+    def report(record):
+        print(f"{record['status']:<6} {record['seconds']:>8.1f}s  {record['source']}")
+
+    summary = run_batch(args.source, args.output, analyses, STRIP_BOILERPLATE,
+                        args.extract_workers, args.llm_concurrency, on_record=report)
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import os
+import re
+
+# embedding-001 accepts 2048 input tokens; stay comfortably below it
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", 1500))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", 50))
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+SENTENCE_PATTERN = re.compile(r"[^\n.!?]*(?:[.!?]+|\n+|$)\s*")
+
+
+def count_tokens(text):
+    # Word pieces plus punctuation: close to SentencePiece counts for English RFP prose
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def _sentences(text):
+    for match in SENTENCE_PATTERN.finditer(text):
+        sentence = match.group(0)
+        if sentence.strip():
+            yield sentence
+
+
+def _split_long(sentence, max_tokens):
+    words = re.findall(r"\S+\s*", sentence)
+    piece, piece_tokens = [], 0
+    for word in words:
+        tokens = count_tokens(word)
+        if piece and piece_tokens + tokens > max_tokens:
+            yield "".join(piece)
+            piece, piece_tokens = [], 0
+        piece.append(word)
+        piece_tokens += tokens
+    if piece:
+        yield "".join(piece)
+
+
+def split_tokens(text, max_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    units = []
+    for sentence in _sentences(text):
+        tokens = count_tokens(sentence)
+        if tokens > max_tokens:
+            units.extend((piece, count_tokens(piece)) for piece in _split_long(sentence, max_tokens))
+        else:
+            units.append((sentence, tokens))
+
+    chunks = []
+    current, current_tokens = [], 0
+    for sentence, tokens in units:
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("".join(piece for piece, _ in current).strip())
+            # Carry whole trailing sentences forward, never more than the overlap budget
+            carried, carried_tokens = [], 0
+            for piece, piece_tokens in reversed(current):
+                if carried_tokens + piece_tokens > overlap_tokens:
+                    break
+                carried.insert(0, (piece, piece_tokens))
+                carried_tokens += piece_tokens
+            current, current_tokens = carried, carried_tokens
+        current.append((sentence, tokens))
+        current_tokens += tokens
+    if current:
+        chunks.append("".join(piece for piece, _ in current).strip())
+    return [chunk for chunk in chunks if chunk]
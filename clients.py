@@ -0,0 +1,79 @@
+import os
+import threading
+
+CHAT_MODEL = "gemini-1.5-flash"
+EMBEDDING_MODEL = "models/embedding-001"
+# "gemini" talks to Google; "fake" swaps in the deterministic local backend
+BACKEND = os.getenv("LLM_BACKEND", "gemini")
+# Vectors are cached by chunk content hash; set to "" to disable
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join("embedding_cache", "embeddings.sqlite3"))
+
+# One client per (model, settings) for the whole process. The clients keep
+# their transport open, so reusing them avoids a new TLS handshake per request.
+_clients = {}
+_lock = threading.Lock()
+_configured = False
+
+
+def _configure():
+    global _configured
+    if _configured or BACKEND == "fake":
+        return
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("GOOGLE_API_KEY not found in environment variables")
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    _configured = True
+
+
+def _get_or_create(key, factory):
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            _configure()
+            client = factory()
+            _clients[key] = client
+        return client
+
+
+def _chat_factory(model, temperature):
+    if BACKEND == "fake":
+        from fake_backend import FakeChatModel
+        return FakeChatModel()
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(model=model, temperature=temperature)
+
+
+def _embeddings_factory(model):
+    if BACKEND == "fake":
+        from fake_backend import FakeEmbeddings
+        return FakeEmbeddings()
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    return GoogleGenerativeAIEmbeddings(model=model)
+
+
+def get_chat_model(model=CHAT_MODEL, temperature=0.3):
+    return _get_or_create(("chat", model, temperature), lambda: _chat_factory(model, temperature))
+
+
+def _cached_embeddings_factory(model):
+    embeddings = _embeddings_factory(model)
+    if not EMBEDDING_CACHE_PATH:
+        return embeddings
+    from embedding_cache import CachedEmbeddings, EmbeddingStore
+    return CachedEmbeddings(embeddings, f"{BACKEND}:{model}", EmbeddingStore(EMBEDDING_CACHE_PATH))
+
+
+def get_embeddings(model=EMBEDDING_MODEL):
+    return _get_or_create(("embeddings", model), lambda: _cached_embeddings_factory(model))
+
+
+def warm_up(chat_models=((CHAT_MODEL, 0.3),), embedding_models=(EMBEDDING_MODEL,)):
+    for model, temperature in chat_models:
+        get_chat_model(model, temperature)
+    for model in embedding_models:
+        get_embeddings(model)
@@ -0,0 +1,54 @@
+import os
+from chunking import count_tokens, split_tokens
+
+QA_CONTEXT_TOKENS = int(os.getenv("QA_CONTEXT_TOKENS", 3000))
+QA_CANDIDATES = int(os.getenv("QA_CANDIDATES", 6))
+MIN_OVERLAP_CHARS = 20
+MAX_OVERLAP_CHARS = 4000
+
+
+def overlap_length(left, right):
+    # Longest suffix of left that is also a prefix of right
+    tail = left[-MAX_OVERLAP_CHARS:]
+    probe = right[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return 0
+    start = tail.find(probe)
+    while start != -1:
+        candidate = len(tail) - start
+        if right.startswith(tail[start:]):
+            return candidate
+        start = tail.find(probe, start + 1)
+    return 0
+
+
+def _trim(text, included):
+    for other in included:
+        text = text[overlap_length(other, text):]
+        cut = overlap_length(text, other)
+        if cut:
+            text = text[:-cut]
+    return text.strip()
+
+
+def pack_context(docs, budget_tokens=QA_CONTEXT_TOKENS):
+    # docs arrive most relevant first; that order is kept in the prompt
+    pieces = []
+    used = 0
+    for doc in docs:
+        text = _trim(doc.page_content, pieces)
+        if not text or text in pieces:
+            continue
+        tokens = count_tokens(text)
+        if used + tokens > budget_tokens:
+            remaining = budget_tokens - used
+            if remaining < 50:
+                break
+            # Keep the leading sentences of a chunk that doesn't fit whole
+            head = split_tokens(text, max_tokens=remaining, overlap_tokens=0)
+            if head:
+                pieces.append(head[0])
+            break
+        pieces.append(text)
+        used += tokens
+    return "\n\n".join(pieces)
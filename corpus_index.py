@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+from boilerplate import PAGE_BREAK, split_pages, strip_boilerplate
+from chunking import split_tokens
+from clients import get_embeddings
+from index_factory import from_texts, is_stale, load_local, supports_removal
+from pdf_cache import document_hash
+from pdf_extract import ExtractedText, extract_pages
+
+MANIFEST_NAME = "manifest.json"
+# How many vectors the index was trained on, so incremental adds know when to retrain
+BUILD_NAME = "build.json"
+INDEX_FILES = ("index.faiss", "index.pkl")
+# Manifest entry for the chunks of an index saved before manifests existed
+LEGACY_ENTRY = "legacy"
+
+
+def stamp(path):
+    # The manifest is replaced last on every save, so its identity versions the whole index
+    try:
+        stat = os.stat(os.path.join(path, MANIFEST_NAME))
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class CorpusIndex:
+    def __init__(self, path="faiss_index", embeddings=None, mmap=False):
+        self.path = path
+        self.embeddings = embeddings or get_embeddings()
+        self._lock = threading.Lock()
+        self.manifest = {}
+        self.vector_store = None
+        self.trained_vectors = 0
+        self.stamp = stamp(path)
+        if self.stamp is not None:
+            with open(os.path.join(path, MANIFEST_NAME)) as f:
+                self.manifest = json.load(f)
+        if all(os.path.exists(os.path.join(path, name)) for name in INDEX_FILES):
+            self.vector_store = load_local(path, self.embeddings, mmap)
+            if self.stamp is None:
+                # Saved by the old test.py, which kept no per-document record: keep its chunks
+                # searchable as one entry that can be removed like a document; the next save adds the manifest
+                ids = list(self.vector_store.index_to_docstore_id.values())
+                self.manifest = {LEGACY_ENTRY: {"name": "Documents indexed before manifests", "ids": ids}}
+            build_path = os.path.join(path, BUILD_NAME)
+            if os.path.exists(build_path):
+                with open(build_path) as f:
+                    self.trained_vectors = json.load(f)["trained_vectors"]
+            else:
+                self.trained_vectors = self.vector_store.index.ntotal
+
+    def documents(self):
+        return {doc_hash: entry["name"] for doc_hash, entry in self.manifest.items()}
+
+    def add_document(self, name, pdf_bytes):
+        doc_hash = document_hash(pdf_bytes)
+        if doc_hash in self.manifest:
+            return doc_hash, False
+
+        cleaned, _ = strip_boilerplate(extract_pages(pdf_bytes))
+        chunks = split_tokens(cleaned)
+        # Cleaned pages keep their form feeds, so offsets into the cleaned text map back to page numbers
+        pages = split_pages(cleaned)
+        layout = ExtractedText([page + PAGE_BREAK for page in pages[:-1]] + pages[-1:])
+        ids = [f"{doc_hash}:{i}" for i in range(len(chunks))]
+        metadatas = [
+            {"source": name, "doc_hash": doc_hash, "chunk": i, "pages": chunk_pages}
+            for i, chunk_pages in enumerate(layout.chunk_pages(chunks))
+        ]
+        with self._lock:
+            if chunks:
+                if self.vector_store is None:
+                    self.vector_store = from_texts(chunks, self.embeddings, metadatas=metadatas, ids=ids)
+                    self.trained_vectors = len(chunks)
+                else:
+                    self.vector_store.add_texts(chunks, metadatas=metadatas, ids=ids)
+            self.manifest[doc_hash] = {"name": name, "ids": ids}
+            if self.vector_store is not None and is_stale(self.vector_store.index, self.trained_vectors):
+                self._rebuild()
+        return doc_hash, True
+
+    def remove_document(self, doc_hash):
+        with self._lock:
+            entry = self.manifest.pop(doc_hash, None)
+            if entry is None:
+                return False
+            if entry["ids"] and self.vector_store is not None:
+                if supports_removal(self.vector_store.index):
+                    self.vector_store.delete(entry["ids"])
+                else:
+                    self._rebuild()
+            return True
+
+    def _rebuild(self):
+        # For HNSW removals and retraining: rebuild from the manifest's chunks (embeddings are cached)
+        ids = [doc_id for entry in self.manifest.values() for doc_id in entry["ids"]]
+        if not ids:
+            self.vector_store = None
+            return
+        docs = [self.vector_store.docstore.search(doc_id) for doc_id in ids]
+        self.vector_store = from_texts(
+            [doc.page_content for doc in docs], self.embeddings,
+            metadatas=[doc.metadata for doc in docs], ids=ids,
+        )
+        self.trained_vectors = len(ids)
+
+    def save(self):
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            if self.vector_store is not None:
+                # Write beside and rename: readers may have the old index.faiss memory-mapped
+                tmp_dir = os.path.join(self.path, ".tmp")
+                self.vector_store.save_local(tmp_dir)
+                with open(os.path.join(tmp_dir, BUILD_NAME), "w") as f:
+                    json.dump({"trained_vectors": self.trained_vectors}, f)
+                for name in INDEX_FILES + (BUILD_NAME,):
+                    os.replace(os.path.join(tmp_dir, name), os.path.join(self.path, name))
+                os.rmdir(tmp_dir)
+            else:
+                for name in INDEX_FILES + (BUILD_NAME,):
+                    if os.path.exists(os.path.join(self.path, name)):
+                        os.remove(os.path.join(self.path, name))
+            # Manifest last: a crash mid-save leaves the previous manifest pointing at a full index
+            tmp_path = os.path.join(self.path, MANIFEST_NAME + ".tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(self.manifest, f, indent=2)
+            os.replace(tmp_path, os.path.join(self.path, MANIFEST_NAME))
+
+
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def load_corpus(path="faiss_index"):
+    # Read-only, memory-mapped corpus shared by every request in the process; reloaded only after a save
+    with _loaded_lock:
+        corpus = _loaded.get(path)
+        if corpus is None or corpus.stamp != stamp(path):
+            corpus = CorpusIndex(path, mmap=True)
+            _loaded[path] = corpus
+        return corpus
@@ -1,17 +1,13 @@
 import os
 from dotenv import load_dotenv
-from pypdf import PdfReader
+from pdf_extract import extract_text, read_pdf_bytes
 import google.generativeai as genai
 
 # Load environment variables
 load_dotenv('.env.local')
 
 def extract_text_from_pdf(pdf_path):
-    reader = PdfReader(pdf_path)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text()
-    return text
+    return extract_text(read_pdf_bytes(pdf_path)).text
 
 def analyze_bid_requirements(text):
     # Initialize Gemini
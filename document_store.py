@@ -0,0 +1,61 @@
+import os
+import re
+import threading
+from pdf_cache import clean_key, document_hash, text_cache
+
+DOC_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class DocumentStore:
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        os.makedirs(root_dir, exist_ok=True)
+
+    def _path(self, doc_id):
+        return os.path.join(self.root_dir, f"{doc_id}.pdf")
+
+    def exists(self, doc_id):
+        return bool(DOC_ID_PATTERN.match(doc_id or "")) and os.path.exists(self._path(doc_id))
+
+    def add(self, pdf_bytes, clean=False):
+        doc_id = document_hash(pdf_bytes)
+        if not os.path.exists(self._path(doc_id)):
+            tmp_path = f"{self._path(doc_id)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(pdf_bytes)
+            os.replace(tmp_path, self._path(doc_id))
+        _, text = text_cache.get_text(pdf_bytes, clean)
+        return doc_id, text
+
+    def get_bytes(self, doc_id):
+        if not self.exists(doc_id):
+            return None
+        with open(self._path(doc_id), "rb") as f:
+            return f.read()
+
+    def get_text(self, doc_id, clean=False):
+        if not self.exists(doc_id):
+            return None
+        text = text_cache.get(clean_key(doc_id) if clean else doc_id)
+        if text is None:
+            # Straight to extraction: get_text would look the key up again and count a second miss
+            raw, cleaned, _ = text_cache.extract(doc_id, self.get_bytes(doc_id))
+            text = cleaned if clean else raw
+        return text
+
+    def get_report(self, doc_id):
+        if not self.exists(doc_id):
+            return None
+        report = text_cache.get_report(doc_id)
+        if report is None:
+            report = text_cache.extract(doc_id, self.get_bytes(doc_id))[2]
+        return report
+
+    def delete(self, doc_id):
+        if not self.exists(doc_id):
+            return False
+        os.remove(self._path(doc_id))
+        return True
+
+
+document_store = DocumentStore(os.getenv("DOCUMENT_STORE_DIR", "document_store"))
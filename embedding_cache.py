@@ -0,0 +1,84 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from contextlib import contextmanager
+from langchain_core.embeddings import Embeddings
+import metrics
+from chunking import count_tokens
+from rate_limit import rate_limiter
+
+# Google's batchEmbedContents accepts at most 100 texts per call
+BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 100))
+
+
+class EmbeddingStore:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_many(self, keys):
+        found = {}
+        with self._lock, self._connect() as conn:
+            # SQLite caps bound parameters, so look keys up in slices
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                for key, blob in conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch):
+                    found[key] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, items):
+        rows = [(key, array("f", vector).tobytes()) for key, vector in items]
+        with self._lock, self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?)", rows)
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embeddings, model, store, batch_size=BATCH_SIZE):
+        self.embeddings = embeddings
+        self.model = model
+        self.store = store
+        self.batch_size = batch_size
+
+    def _key(self, text):
+        return hashlib.sha256(f"{self.model}\x00{text}".encode("utf-8")).hexdigest()
+
+    def embed_documents(self, texts):
+        keys = [self._key(text) for text in texts]
+        unique = list(dict.fromkeys(keys))
+        vectors = self.store.get_many(unique)
+        missing = [key for key in unique if key not in vectors]
+        metrics.embedding_chunks_total.inc(len(unique) - len(missing), result="hit")
+        metrics.embedding_chunks_total.inc(len(missing), result="miss")
+
+        # Only text never seen before (in this document or any earlier one) is embedded
+        text_for_key = dict(zip(keys, texts))
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            batch_texts = [text_for_key[key] for key in batch]
+            with metrics.timed("embed"):
+                embedded = rate_limiter.call(
+                    lambda: self.embeddings.embed_documents(batch_texts), sum(count_tokens(text) for text in batch_texts))
+            self.store.put_many(zip(batch, embedded))
+            vectors.update(zip(batch, embedded))
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text):
+        with metrics.timed("embed_query"):
+            return rate_limiter.call(lambda: self.embeddings.embed_query(text), count_tokens(text))
@@ -0,0 +1,73 @@
+import hashlib
+import math
+import os
+import re
+import time
+from typing import Any, Iterator, List, Optional
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import SimpleChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk
+
+HEADING_PATTERN = re.compile(r"^\s*([A-Z][A-Z &/]+[A-Z]):", re.MULTILINE)
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def _sleep_ms(ms):
+    if ms > 0:
+        time.sleep(ms / 1000)
+
+
+def fake_completion(prompt):
+    # Echo the prompt's section headings so downstream parsing sees the real shape
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+    headings = list(dict.fromkeys(HEADING_PATTERN.findall(prompt)))
+    if not headings:
+        return f"Fake answer {digest}."
+    return "\n\n".join(f"{heading}:\n- Fake finding {digest}" for heading in headings)
+
+
+class FakeChatModel(SimpleChatModel):
+    first_token_ms: float = float(os.getenv("FAKE_LLM_FIRST_TOKEN_MS", 0))
+    token_ms: float = float(os.getenv("FAKE_LLM_TOKEN_MS", 0))
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    def _prompt(self, messages: List[BaseMessage]) -> str:
+        return "\n".join(str(message.content) for message in messages)
+
+    def _call(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        text = fake_completion(self._prompt(messages))
+        _sleep_ms(self.first_token_ms + self.token_ms * len(text.split()))
+        return text
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        _sleep_ms(self.first_token_ms)
+        for word in re.findall(r"\S+\s*", fake_completion(self._prompt(messages))):
+            _sleep_ms(self.token_ms)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+
+
+class FakeEmbeddings(Embeddings):
+    def __init__(self, dimensions=768, latency_ms=None):
+        self.dimensions = dimensions
+        self.latency_ms = float(os.getenv("FAKE_EMBEDDING_MS", 0)) if latency_ms is None else latency_ms
+
+    def _embed(self, text):
+        # Hashed bag of words: deterministic, and similar texts land close together
+        vector = [0.0] * self.dimensions
+        for word in WORD_PATTERN.findall(text.lower()):
+            bucket = int.from_bytes(hashlib.md5(word.encode("utf-8")).digest()[:4], "little")
+            vector[bucket % self.dimensions] += 1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts):
+        _sleep_ms(self.latency_ms)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        _sleep_ms(self.latency_ms)
+        return self._embed(text)
@@ -0,0 +1,90 @@
+import argparse
+import json
+import time
+import faiss
+import numpy as np
+import index_factory
+from benchmark import percentile
+
+CONFIGS = [
+    ("flat", "float32"),
+    ("flat", "float16"),
+    ("flat", "int8"),
+    ("hnsw", "float32"),
+    ("hnsw", "float16"),
+    ("hnsw", "int8"),
+    ("ivfpq", "float32"),
+]
+
+
+def make_embeddings(count, dimensions, clusters, seed=0):
+    # Clustered like real chunk embeddings; uniform noise makes every index look equally bad
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimensions)).astype("float32")
+    labels = rng.integers(0, clusters, size=count)
+    vectors = centers[labels] + 0.3 * rng.normal(size=(count, dimensions)).astype("float32")
+    return vectors.astype("float32")
+
+
+def recall_at_k(found, truth, k):
+    hits = sum(len(set(row[:k]) & set(expected[:k])) for row, expected in zip(found, truth))
+    return hits / (len(truth) * k)
+
+
+def run_config(kind, storage, vectors, queries, truth, k):
+    start = time.perf_counter()
+    index = index_factory.build_index(vectors, kind, storage)
+    build_seconds = time.perf_counter() - start
+
+    latencies, found = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found.append(ids[0].tolist())
+    return {
+        "factory": index_factory.factory_string(vectors.shape[1], len(vectors), kind, storage),
+        "recall": recall_at_k(found, truth, k),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "build_s": build_seconds,
+        "size_mb": faiss.serialize_index(index).nbytes / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare recall and latency of FAISS index types on synthetic embeddings")
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--only", nargs="*", help="run only configs whose name contains one of these")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    data = make_embeddings(args.vectors + args.queries, args.dimensions, args.clusters)
+    vectors, queries = data[:args.vectors], data[args.vectors:]
+    exact = faiss.IndexFlatL2(args.dimensions)
+    exact.add(vectors)
+    _, truth = exact.search(queries, args.k)
+    truth = truth.tolist()
+
+    results = {}
+    for kind, storage in CONFIGS:
+        name = f"{kind}/{storage}"
+        if args.only and not any(pattern in name for pattern in args.only):
+            continue
+        results[name] = run_config(kind, storage, vectors, queries, truth, args.k)
+
+    print(f"{'config':<16} {'factory':<18} {f'recall@{args.k}':>10} {'p50 ms':>9} {'p95 ms':>9} {'build s':>9} {'size MB':>9}")
+    for name, row in results.items():
+        print(f"{name:<16} {row['factory']:<18} {row['recall']:>10.3f} {row['p50_ms']:>9.3f} "
+              f"{row['p95_ms']:>9.3f} {row['build_s']:>9.2f} {row['size_mb']:>9.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import math
+import os
+import pickle
+import faiss
+import numpy as np
+from langchain.docstore.in_memory import InMemoryDocstore
+from langchain.schema import Document
+from langchain.vectorstores import FAISS
+
+# flat | hnsw | ivfpq
+INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+# float32 | float16 | int8; ignored by ivfpq, which compresses with PQ codes
+VECTOR_STORAGE = os.getenv("FAISS_VECTOR_STORAGE", "float32")
+HNSW_M = int(os.getenv("FAISS_HNSW_M", 32))
+HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", 64))
+IVF_NPROBE = int(os.getenv("FAISS_IVF_NPROBE", 16))
+PQ_BITS = 8
+# Trained indexes grown incrementally are rebuilt once they hold this many times the vectors they were trained on
+RETRAIN_GROWTH = float(os.getenv("FAISS_RETRAIN_GROWTH", 2))
+# FAISS warns below ~39 training points per centroid
+MIN_POINTS_PER_CENTROID = 39
+
+STORAGE_SUFFIX = {"float32": "Flat", "float16": "SQfp16", "int8": "SQ8"}
+
+
+def _pq_subquantizers(dimensions):
+    # Largest of these that divides the dimension; 768-d embeddings get 96 x 8-dim codes
+    for m in (96, 64, 48, 32, 24, 16, 8, 4, 2, 1):
+        if dimensions % m == 0:
+            return m
+    return 1
+
+
+def factory_string(dimensions, count, kind=INDEX_TYPE, storage=VECTOR_STORAGE):
+    if storage not in STORAGE_SUFFIX:
+        raise ValueError(f"Unknown vector storage '{storage}'")
+    if kind == "flat":
+        return STORAGE_SUFFIX[storage]
+    if kind == "hnsw":
+        return f"HNSW{HNSW_M}" if storage == "float32" else f"HNSW{HNSW_M},{STORAGE_SUFFIX[storage]}"
+    if kind == "ivfpq":
+        # PQ trains 2^bits centroids per sub-quantizer, so small indexes stay exact
+        if count < (2 ** PQ_BITS) * MIN_POINTS_PER_CENTROID:
+            return STORAGE_SUFFIX[storage]
+        nlist = max(1, min(int(4 * math.sqrt(count)), count // MIN_POINTS_PER_CENTROID))
+        return f"IVF{nlist},PQ{_pq_subquantizers(dimensions)}x{PQ_BITS}"
+    raise ValueError(f"Unknown FAISS index type '{kind}'")
+
+
+def tune(index):
+    parameters = faiss.ParameterSpace()
+    if "HNSW" in type(index).__name__:
+        parameters.set_index_parameter(index, "efSearch", HNSW_EF_SEARCH)
+    if "IVF" in type(index).__name__:
+        parameters.set_index_parameter(index, "nprobe", IVF_NPROBE)
+    return index
+
+
+def build_index(vectors, kind=INDEX_TYPE, storage=VECTOR_STORAGE):
+    vectors = np.asarray(vectors, dtype="float32")
+    count, dimensions = vectors.shape
+    index = faiss.index_factory(dimensions, factory_string(dimensions, count, kind, storage))
+    if not index.is_trained:
+        # Polysemous codes only help Hamming pre-filtering, which search never uses, and cost minutes to train
+        if hasattr(index, "do_polysemous_training"):
+            index.do_polysemous_training = False
+        index.train(vectors)
+    index.add(vectors)
+    return tune(index)
+
+
+def needs_training(description):
+    return "IVF" in description or "SQ8" in description
+
+
+def is_stale(index, trained_vectors, kind=INDEX_TYPE, storage=VECTOR_STORAGE):
+    # add() never retrains: an ivfpq corpus that started below the training size stays flat, and
+    # SQ8 ranges or IVF centroids fitted to the first documents clip or skew everything added later
+    wanted = factory_string(index.d, index.ntotal, kind, storage)
+    if not needs_training(wanted):
+        return False
+    if "IVF" in wanted and "IVF" not in type(index).__name__:
+        return True
+    return index.ntotal >= RETRAIN_GROWTH * max(trained_vectors, 1)
+
+
+def supports_removal(index):
+    return "HNSW" not in type(index).__name__
+
+
+def from_texts(texts, embeddings, metadatas=None, ids=None, kind=INDEX_TYPE, storage=VECTOR_STORAGE):
+    # Same result shape as FAISS.from_texts, but over the configured index type
+    vectors = embeddings.embed_documents(list(texts))
+    index = build_index(vectors, kind, storage)
+    ids = ids or [str(i) for i in range(len(texts))]
+    metadatas = metadatas or [{} for _ in texts]
+    docstore = InMemoryDocstore({
+        doc_id: Document(page_content=text, metadata=metadata)
+        for doc_id, text, metadata in zip(ids, texts, metadatas)
+    })
+    return FAISS(embeddings, index, docstore, dict(enumerate(ids)))
+
+
+def load_local(path, embeddings, mmap=False):
+    if not mmap:
+        vector_store = FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+        tune(vector_store.index)
+        return vector_store
+    # Same files FAISS.save_local writes, but vectors stay on disk and pages load on first search
+    index_path = os.path.join(path, "index.faiss")
+    try:
+        index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        index = faiss.read_index(index_path)
+    with open(os.path.join(path, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return FAISS(embeddings, tune(index), docstore, index_to_docstore_id)
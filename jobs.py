@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class Job:
+    def __init__(self, kind, cancel_event=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        # Set on cancel so long-running work can stop between steps; future.cancel() only helps queued jobs
+        self.cancel_event = cancel_event or threading.Event()
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    def __init__(self, max_workers=4, retention_seconds=3600):
+        self.retention_seconds = retention_seconds
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _run(self, job, work):
+        with self._lock:
+            if job.status == CANCELLED:
+                return
+            job.status = RUNNING
+            job.started_at = time.time()
+        try:
+            result = work()
+        except Exception as e:
+            with self._lock:
+                if job.status != CANCELLED:
+                    job.status = FAILED
+                    job.error = str(e)
+                job.finished_at = time.time()
+            return
+        with self._lock:
+            # A job cancelled while running keeps its cancelled status and drops the result
+            if job.status != CANCELLED:
+                job.status = DONE
+                job.result = result
+            job.finished_at = time.time()
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def submit(self, kind, work, cancel_event=None):
+        job = Job(kind, cancel_event)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        job.future = self._pool.submit(self._run, job, work)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job.status in (QUEUED, RUNNING):
+                job.status = CANCELLED
+                job.finished_at = time.time()
+                job.cancel_event.set()
+                if job.future:
+                    job.future.cancel()
+            return job
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return counts
+
+
+job_queue = JobQueue(
+    max_workers=int(os.getenv("JOB_WORKERS", 4)),
+    retention_seconds=int(os.getenv("JOB_RETENTION_SECONDS", 3600)),
+)
@@ -0,0 +1,46 @@
+const API_URL = "http://localhost:5000";
+
+const docIds = new Map<string, string>();
+
+const hashFile = async (file: File) => {
+  const digest = await crypto.subtle.digest("SHA-256", await file.arrayBuffer());
+  return Array.from(new Uint8Array(digest))
+    .map((byte) => byte.toString(16).padStart(2, "0"))
+    .join("");
+};
+
+// Upload a PDF at most once per session and return its doc_id. The backend
+// keys documents by SHA-256, so an already stored file is never re-sent.
+export const getDocId = async (file: File) => {
+  const hash = await hashFile(file);
+  const cached = docIds.get(hash);
+  if (cached) {
+    return cached;
+  }
+
+  const existing = await fetch(`${API_URL}/documents/${hash}`);
+  if (existing.ok) {
+    docIds.set(hash, hash);
+    return hash;
+  }
+
+  const formData = new FormData();
+  formData.append("pdf", file);
+  const response = await fetch(`${API_URL}/documents`, {
+    method: "POST",
+    body: formData,
+  });
+  const data = await response.json();
+  if (!response.ok) {
+    throw new Error(data.error || "Failed to upload document");
+  }
+
+  docIds.set(hash, data.doc_id);
+  return data.doc_id as string;
+};
+
+export const documentForm = async (file: File) => {
+  const formData = new FormData();
+  formData.append("doc_id", await getDocId(file));
+  return formData;
+};
@@ -0,0 +1,161 @@
+import contextvars
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from singleflight import SingleFlight
+
+# Holds the list of hit/miss flags for the request being served. Worker
+# threads see it when their task is submitted through run_in_context.
+_request_events = contextvars.ContextVar("llm_cache_events", default=None)
+
+
+def track_request():
+    events = []
+    _request_events.set(events)
+    return events
+
+
+def run_in_context(pool, fn, *args):
+    return pool.submit(contextvars.copy_context().run, fn, *args)
+
+
+def _record(hit):
+    events = _request_events.get()
+    if events is not None:
+        events.append(hit)
+
+
+def cache_header(events):
+    if not events:
+        return None
+    if all(events):
+        return "HIT"
+    if not any(events):
+        return "MISS"
+    return "PARTIAL"
+
+
+class LLMCache:
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.flights = SingleFlight(path + ".lock")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, template TEXT, response TEXT, size INTEGER, "
+                "created_at REAL, accessed_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(template, version, content, model, temperature):
+        content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        raw = f"{template}:{version}:{content_hash}:{model}:{temperature}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def lookup(self, key):
+        # Like get, without counting toward hit/miss stats or the request's cache header
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                return None
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def get(self, key):
+        response = self.lookup(key)
+        with self._lock:
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        _record(response is not None)
+        return response
+
+    def put(self, key, template, response):
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, template, response, size, now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        if self.ttl_seconds:
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries until the table fits again
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def get_or_compute(self, template, version, content, model, temperature, compute):
+        key = self.make_key(template, version, content, model, temperature)
+        response = self.get(key)
+        if response is None:
+            # Identical prompts already generating, here or in another worker, are waited on rather than repeated
+            response = self.flights.run(key, lambda: self._compute(key, template, compute), lambda: self.lookup(key))
+        return response
+
+    def _compute(self, key, template, compute):
+        response = compute()
+        self.put(key, template, response)
+        return response
+
+    def purge(self, template=None):
+        with self._lock, self._connect() as conn:
+            if template:
+                cursor = conn.execute("DELETE FROM responses WHERE template = ?", (template,))
+            else:
+                cursor = conn.execute("DELETE FROM responses")
+            return cursor.rowcount
+
+    def stats(self):
+        with self._lock, self._connect() as conn:
+            entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.flights.coalesced,
+                "entries": entries,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+llm_cache = LLMCache(
+    os.getenv("LLM_CACHE_PATH", os.path.join("llm_cache", "responses.sqlite3")),
+    ttl_seconds=int(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600)),
+    max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+)
@@ -0,0 +1,126 @@
+import hashlib
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from boilerplate import PAGE_BREAK, split_pages
+from llm_cache import run_in_context
+
+# Rough Gemini ratio; good enough to keep each section well inside the budget
+CHARS_PER_TOKEN = 4
+SECTION_TOKENS = int(os.getenv("LONG_DOC_SECTION_TOKENS", 30000))
+FAN_OUT = int(os.getenv("LONG_DOC_FAN_OUT", 4))
+# Average pages per map section when the text keeps its page breaks
+SECTION_PAGES = int(os.getenv("LONG_DOC_SECTION_PAGES", 8))
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _split_characters(text, section_tokens):
+    chunk_size = section_tokens * CHARS_PER_TOKEN
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_size // 50)
+    return text_splitter.split_text(text)
+
+
+def _is_boundary(page):
+    digest = hashlib.sha256(page.encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "little") % SECTION_PAGES == 0
+
+
+def split_page_sections(pages, section_tokens=SECTION_TOKENS):
+    # Section ends are chosen by page content, not position, so editing one page of
+    # an amendment leaves the other sections byte-identical and their cached results reusable
+    sections = []
+    current, current_tokens = [], 0
+    for page in pages:
+        tokens = estimate_tokens(page)
+        if tokens > section_tokens:
+            if current:
+                sections.append(PAGE_BREAK.join(current))
+                current, current_tokens = [], 0
+            sections.extend(_split_characters(page, section_tokens))
+            continue
+        if current and current_tokens + tokens > section_tokens:
+            sections.append(PAGE_BREAK.join(current))
+            current, current_tokens = [], 0
+        current.append(page)
+        current_tokens += tokens
+        if _is_boundary(page):
+            sections.append(PAGE_BREAK.join(current))
+            current, current_tokens = [], 0
+    if current:
+        sections.append(PAGE_BREAK.join(current))
+    return sections
+
+
+def split_sections(text, section_tokens=SECTION_TOKENS):
+    if PAGE_BREAK in text:
+        return split_page_sections(split_pages(text), section_tokens)
+    return _split_characters(text, section_tokens)
+
+
+def map_sections(text, section_tokens=SECTION_TOKENS):
+    # Exactly what map_reduce sends to the model: the whole text when it fits, else its sections
+    if estimate_tokens(text) <= section_tokens:
+        return [text]
+    return split_sections(text, section_tokens)
+
+
+def _normalize(line):
+    return re.sub(r"\s+", " ", line.strip().lstrip("-*• ").strip('"')).lower()
+
+
+def _heading_of(line, headings):
+    stripped = line.strip().strip("*#").strip().upper()
+    for heading in headings:
+        if stripped.startswith(heading + ":") or stripped == heading:
+            return heading
+    return None
+
+
+def parse_sections(result, headings):
+    parsed = {heading: [] for heading in headings}
+    current = None
+    for line in result.splitlines():
+        heading = _heading_of(line, headings)
+        if heading:
+            current = heading
+            remainder = line.split(":", 1)[1].strip() if ":" in line else ""
+            if remainder.strip("*"):
+                parsed[current].append(remainder.strip("*").strip())
+        elif current and line.strip():
+            parsed[current].append(line.strip())
+    return parsed
+
+
+def merge_results(results, placeholders):
+    # placeholders maps each heading to the "nothing found" sentence of its prompt
+    merged = {heading: [] for heading in placeholders}
+    seen = {heading: set() for heading in placeholders}
+    for result in results:
+        for heading, lines in parse_sections(result, placeholders).items():
+            for line in lines:
+                key = _normalize(line)
+                if key in seen[heading] or placeholders[heading].lower() in key:
+                    continue
+                seen[heading].add(key)
+                merged[heading].append(line)
+
+    blocks = []
+    for heading, placeholder in placeholders.items():
+        lines = merged[heading] or [f"- {placeholder}"]
+        blocks.append(f"{heading}:\n" + "\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+def map_reduce(text, analyze, placeholders, section_tokens=SECTION_TOKENS, fan_out=FAN_OUT):
+    if estimate_tokens(text) <= section_tokens:
+        return analyze(text)
+
+    sections = split_sections(text, section_tokens)
+    with ThreadPoolExecutor(max_workers=max(1, min(fan_out, len(sections)))) as pool:
+        futures = [run_in_context(pool, analyze, section) for section in sections]
+        results = [future.result() for future in futures]
+    return merge_results(results, placeholders)
@@ -0,0 +1,125 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Per-request list of (stage, seconds); shared with worker threads the same
+# way as the LLM cache events, via llm_cache.run_in_context.
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(key, {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series["counts"]):
+                    lines.append(f"{self.name}_bucket{_label_text(key + (('le', bound),))} {count}")
+                lines.append(f"{self.name}_bucket{_label_text(key + (('le', '+Inf'),))} {series['count']}")
+                lines.append(f"{self.name}_sum{_label_text(key)} {series['sum']}")
+                lines.append(f"{self.name}_count{_label_text(key)} {series['count']}")
+        return lines
+
+
+stage_seconds = Histogram("rfp_stage_seconds", "Time spent in each hot-path stage")
+request_seconds = Histogram("rfp_request_seconds", "End-to-end request latency by route")
+requests_total = Counter("rfp_requests_total", "Requests by route and status code")
+errors_total = Counter("rfp_errors_total", "Requests that returned a 5xx, by route")
+prompt_chars_total = Counter("rfp_llm_prompt_characters_total", "Characters sent to the model")
+prompt_tokens_total = Counter("rfp_llm_prompt_tokens_total", "Estimated tokens sent to the model")
+completion_chars_total = Counter("rfp_llm_completion_characters_total", "Characters received from the model")
+embedding_chunks_total = Counter("rfp_embedding_chunks_total", "Chunks sent for embedding, by cache result")
+retrieval_total = Counter("rfp_retrieval_total", "Retrievals by path: lexical fast path or hybrid")
+verification_checks_total = Counter("rfp_verification_checks_total", "Verification requirements by who settled them: rules or llm")
+boilerplate_tokens_saved_total = Counter("rfp_boilerplate_tokens_saved_total", "Tokens removed as repeated headers, footers and page numbers")
+
+REGISTRY = [
+    stage_seconds, request_seconds, requests_total, errors_total,
+    prompt_chars_total, prompt_tokens_total, completion_chars_total, embedding_chunks_total,
+    retrieval_total, boilerplate_tokens_saved_total, verification_checks_total,
+]
+
+
+def track_request():
+    timings = []
+    _request_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def timed(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_seconds.observe(elapsed, stage=stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+
+def server_timing(timings):
+    # Stages that ran more than once (map-reduce sections, parallel analyses) are summed
+    totals = {}
+    for stage, elapsed in timings:
+        totals[stage] = totals.get(stage, 0.0) + elapsed
+    return ", ".join(f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in totals.items())
+
+
+def record_prompt(template, prompt, tokens):
+    prompt_chars_total.inc(len(prompt), template=template)
+    prompt_tokens_total.inc(tokens, template=template)
+
+
+def render(extra_lines=()):
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    lines.extend(extra_lines)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+import metrics
+from boilerplate import strip_boilerplate
+from metrics import timed
+from pdf_extract import extract_pages, extract_text
+
+
+# Bump when boilerplate stripping changes so cleaned text and reports cached on disk are redone
+CLEAN_VERSION = 3
+
+
+def document_hash(pdf_bytes):
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+def clean_key(key):
+    return f"{key}.clean{CLEAN_VERSION}"
+
+
+def report_key(key):
+    return f"{key}.report{CLEAN_VERSION}"
+
+
+def parse_pdf_text(pdf_bytes):
+    return extract_text(pdf_bytes).text
+
+
+class PdfTextCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024, disk_dir=None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.txt")
+
+    def _remember(self, key, text):
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._size -= self._entries.pop(key)[1]
+        self._entries[key] = (text, size)
+        self._size += size
+        while self._size > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._size -= evicted_size
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        if self.disk_dir and os.path.exists(self._disk_path(key)):
+            with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                text = f.read()
+            with self._lock:
+                self._remember(key, text)
+                self.disk_hits += 1
+            return text
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, text):
+        with self._lock:
+            self._remember(key, text)
+        if self.disk_dir:
+            # Write to a temp file first so a crash never leaves a truncated entry
+            tmp_path = f"{self._disk_path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, self._disk_path(key))
+
+    def get_text(self, pdf_bytes, clean=False):
+        key = document_hash(pdf_bytes)
+        text = self.get(clean_key(key) if clean else key)
+        if text is None:
+            raw, cleaned, _ = self.extract(key, pdf_bytes)
+            text = cleaned if clean else raw
+        return key, text
+
+    def extract(self, key, pdf_bytes):
+        with timed("extract"):
+            pages = extract_pages(pdf_bytes)
+        return self.put_pages(key, pages)
+
+    def put_pages(self, key, pages):
+        # Raw text, boilerplate-stripped text and the savings report are cached together
+        with timed("boilerplate"):
+            cleaned, report = strip_boilerplate(pages)
+        raw = "".join(pages)
+        self.put(key, raw)
+        self.put(clean_key(key), cleaned)
+        self.put(report_key(key), json.dumps(report))
+        metrics.boilerplate_tokens_saved_total.inc(report["tokens_saved"])
+        return raw, cleaned, report
+
+    def get_report(self, key, pdf_bytes=None):
+        report = self.get(report_key(key))
+        if report is not None:
+            return json.loads(report)
+        if pdf_bytes is None:
+            return None
+        return self.extract(key, pdf_bytes)[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+text_cache = PdfTextCache(
+    max_bytes=int(os.getenv("PDF_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+    disk_dir=os.getenv("PDF_CACHE_DIR") or None,
+)
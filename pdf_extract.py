@@ -0,0 +1,75 @@
+import bisect
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from PyPDF2 import PdfReader
+
+# Below this many pages the cost of starting worker processes outweighs the gain
+PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 40))
+MAX_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", os.cpu_count() or 1))
+
+
+class ExtractedText:
+    def __init__(self, pages):
+        self.pages = pages
+        self.page_offsets = []
+        offset = 0
+        for page in pages:
+            self.page_offsets.append(offset)
+            offset += len(page)
+        self.text = "".join(pages)
+
+    def page_for_offset(self, offset):
+        return max(bisect.bisect_right(self.page_offsets, offset) - 1, 0)
+
+    def pages_for_span(self, start, end):
+        return list(range(self.page_for_offset(start), self.page_for_offset(max(end - 1, start)) + 1))
+
+    def chunk_pages(self, chunks):
+        # 1-based pages each chunk spans; chunks are in text order and may overlap, so search from the last start
+        cursor = 0
+        for chunk in chunks:
+            start = self.text.find(chunk, cursor)
+            if start < 0:
+                yield []
+                continue
+            cursor = start + 1
+            yield [page + 1 for page in self.pages_for_span(start, start + len(chunk))]
+
+
+def _extract_range(pdf_bytes, start, stop):
+    pdf_reader = PdfReader(BytesIO(pdf_bytes))
+    return [pdf_reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _page_ranges(page_count, workers):
+    size = -(-page_count // workers)
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def extract_pages(pdf_bytes, max_workers=None):
+    max_workers = max_workers or MAX_WORKERS
+    page_count = len(PdfReader(BytesIO(pdf_bytes)).pages)
+    if page_count < PARALLEL_MIN_PAGES or max_workers < 2:
+        return _extract_range(pdf_bytes, 0, page_count)
+
+    ranges = _page_ranges(page_count, min(max_workers, page_count))
+    with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+        futures = [pool.submit(_extract_range, pdf_bytes, start, stop) for start, stop in ranges]
+        pages = []
+        for future in futures:
+            pages.extend(future.result())
+    return pages
+
+
+def extract_text(pdf_bytes, max_workers=None):
+    return ExtractedText(extract_pages(pdf_bytes, max_workers))
+
+
+def read_pdf_bytes(pdf):
+    if isinstance(pdf, (bytes, bytearray)):
+        return bytes(pdf)
+    if isinstance(pdf, (str, os.PathLike)):
+        with open(pdf, "rb") as f:
+            return f.read()
+    return pdf.read()
@@ -0,0 +1,281 @@
+import os
+import re
+from functools import lru_cache
+from chunking import count_tokens
+
+# Unresolved requirements sent to the model are capped at this many tokens
+VERIFY_GAP_TOKENS = int(os.getenv("VERIFY_GAP_TOKENS", 1500))
+
+MET = "met"
+NOT_MET = "not met"
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "fifteen": 15, "twenty": 20,
+}
+NUMBER = r"(\d{1,2}|" + "|".join(NUMBER_WORDS) + r")\s*(?:\(\d{1,2}\)\s*)?\+?"
+AT_LEAST = r"(?:(?:a\s+)?minimum\s+(?:of\s+)?|at\s+least\s+|no\s+(?:less|fewer)\s+than\s+)?"
+
+SENTENCE_BREAK = re.compile(r"(?<=[.!?;])\s+(?=[A-Z0-9(•\-])|\n\s*\n|\n\s*(?=[•\-*]|\d+[.)]\s|\([a-z0-9]\)\s)|\f")
+LINE_WRAP = re.compile(r"\s*\n\s*")
+DOT_LEADER = re.compile(r"\.{5,}")
+REQUIREMENT = re.compile(r"\b(shall|must|required?|requirements?|minimum|at least|no less than|mandatory|eligib\w*|qualif\w*)\b", re.IGNORECASE)
+# Preferences rank offers; they don't decide who may bid
+PREFERENCE = re.compile(r"\b(preferred|preference|desired|desirable|advantageous|a plus|encouraged)\b", re.IGNORECASE)
+# Alternatives and conditions that one rule can't weigh: a failed check in such a sentence goes to the model
+AMBIGUOUS = re.compile(r"\b(or|either|if|unless|where|when|may|applicable|equivalent)\b", re.IGNORECASE)
+GAP_TOPIC = re.compile(
+    r"\b(experience|years?|staff(?:ing)?|services?|personnel|insurance|insured|licen[sc]\w*|certif\w*|"
+    r"registration|registered|bond(?:ing|ed)?|references?|past performance|financial|eligib\w*)\b",
+    re.IGNORECASE,
+)
+
+EXPERIENCE = [
+    re.compile(AT_LEAST + NUMBER + r"\s*years?['’]?\s+(?:of\s+)?(?:[\w-]+\s+){0,4}?experience", re.IGNORECASE),
+    re.compile(r"experience\s+(?:of\s+)?" + AT_LEAST + NUMBER + r"\s*years?", re.IGNORECASE),
+]
+EXISTENCE = [
+    re.compile(r"(?:in\s+business|in\s+operation|in\s+existence|established|operating)\s+(?:for\s+)?" + AT_LEAST + NUMBER + r"\s*years?", re.IGNORECASE),
+    re.compile(AT_LEAST + NUMBER + r"\s*years?\s+(?:of\s+|in\s+)(?:business|operation|existence)", re.IGNORECASE),
+]
+NAICS = re.compile(r"\bNAICS\b[^.\n]{0,80}", re.IGNORECASE)
+NAICS_CODE = re.compile(r"\b\d{6}\b")
+REGISTRATIONS = {
+    "DUNS number": (re.compile(r"\b(DUNS|D-U-N-S)\b|Dun\s*(?:&|and)\s*Bradstreet", re.IGNORECASE), "duns"),
+    "CAGE code": (re.compile(r"\bCAGE\b"), "cage"),
+    # Upper-case only for the bare acronym, so "Contact Sam Smith" is not a registration
+    "SAM.gov registration": (re.compile(r"\bSAM\b|(?i:\bsam\.gov\b|System\s+for\s+Award\s+Management)"), "sam"),
+    "UEI": (re.compile(r"\bUEI\b|Unique\s+Entity\s+(?:ID|Identifier)", re.IGNORECASE), "uei"),
+    "W-9 form": (re.compile(r"\bW-?9\b"), "w9"),
+    "bank letter of creditworthiness": (re.compile(
+        r"\b(?:bank|financial\s+institution)\b[^.\n]{0,40}\bletter\b|letter\s+of\s+credit(?:worthiness)?", re.IGNORECASE), "bank_letter"),
+}
+COVERAGES = {
+    "certificate of insurance": re.compile(r"certificate\s+of\s+insurance|proof\s+of\s+insurance", re.IGNORECASE),
+    "workers' compensation": re.compile(r"workers['’]?\s*comp(?:ensation)?", re.IGNORECASE),
+    "general liability": re.compile(r"(?<!professional )(?<!cyber )(?<!auto )(?<!automobile )\b(?:commercial\s+)?(?:general\s+)?liability\s+insurance|general\s+liability", re.IGNORECASE),
+    "automobile liability": re.compile(r"\bauto(?:mobile)?\s+liability", re.IGNORECASE),
+    "professional liability": re.compile(r"professional\s+liability|errors\s+(?:and|&)\s+omissions", re.IGNORECASE),
+    "cyber liability": re.compile(r"cyber\s+(?:liability|insurance)", re.IGNORECASE),
+    "fidelity bond": re.compile(r"fidelity\s+bond|crime\s+(?:insurance|coverage)", re.IGNORECASE),
+}
+DOLLAR_AMOUNT = re.compile(r"\$\s?\d[\d,]*(?:\.\d+)?(?:\s*(?:million|M)\b)?", re.IGNORECASE)
+STATE_LICENSE = re.compile(r"licen[sc]\w*\b[^.\n]{0,60}?\b[Ss]tate\s+of\s+([A-Z][a-z]+(?:\s[A-Z][a-z]+)?)")
+CERTIFICATIONS = {
+    "MBE": re.compile(r"\bMBE\b|minority[- ]owned", re.IGNORECASE),
+    "WBE": re.compile(r"\bWBE\b|wom[ae]n[- ]owned", re.IGNORECASE),
+    "DBE": re.compile(r"\bDBE\b|disadvantaged\s+business", re.IGNORECASE),
+    "HUB": re.compile(r"\bHUB\b|historically\s+underutilized", re.IGNORECASE),
+    "HUBZone": re.compile(r"\bHUBZone\b", re.IGNORECASE),
+    "SDVOSB": re.compile(r"\bSDVOSB\b|service[- ]disabled\s+veteran", re.IGNORECASE),
+}
+# Set-aside goals ("shall make a good faith effort to utilize HUBs") are not vendor requirements
+CERTIFICATION_REQUIRED = re.compile(
+    r"\b(?:must|shall)\s+(?:be|hold|have|possess|provide)\b[^.]{0,60}\b(?:certified|certification|certificate)\b|"
+    r"\bcertification\s+(?:is\s+)?(?:required|mandatory)",
+    re.IGNORECASE,
+)
+# Profiles tend to say just "Liability"; read that as general liability unless qualified
+BARE_LIABILITY = re.compile(r"(?<!professional )(?<!cyber )\bliability\b", re.IGNORECASE)
+# ...and a bare "Auto" in the insurance field as automobile liability
+BARE_AUTO = re.compile(r"\bauto(?:mobile)?\b", re.IGNORECASE)
+NEGATIVE = re.compile(r"^\s*(no\b|not\b|none\b|n/a\b)", re.IGNORECASE)
+
+
+def _number(value):
+    value = value.lower()
+    return NUMBER_WORDS[value] if value in NUMBER_WORDS else int(value)
+
+
+def _years(value):
+    match = re.search(NUMBER + r"\s*years?", value or "", re.IGNORECASE)
+    return _number(match.group(1)) if match else None
+
+
+def _affirmative(value):
+    return bool(value) and not NEGATIVE.match(value)
+
+
+def normalize_profile(profile):
+    def field(*words):
+        # Profile keys are human-written labels; match them by keyword rather than exact text
+        for key, value in profile.items():
+            if all(word.lower() in key.lower() for word in words):
+                return str(value)
+        return ""
+
+    insurance = field("insurance")
+    certifications = {
+        name for name, pattern in CERTIFICATIONS.items()
+        for key, value in profile.items()
+        if pattern.search(key) and _affirmative(str(value))
+    }
+    return {
+        "experience_years": _years(field("years", "experience")),
+        "existence_years": _years(field("existence")),
+        "naics": set(NAICS_CODE.findall(field("naics"))),
+        "duns": _affirmative(field("duns")),
+        "cage": _affirmative(field("cage")),
+        "sam": _affirmative(field("sam")),
+        "uei": _affirmative(field("uei")),
+        "w9": _affirmative(field("w-9")) or _affirmative(field("w9")),
+        "bank_letter": _affirmative(field("bank")),
+        "coverages": {name for name, pattern in COVERAGES.items() if pattern.search(insurance)}
+                     | ({"certificate of insurance"} if _affirmative(insurance) else set())
+                     | ({"general liability"} if BARE_LIABILITY.search(insurance) else set())
+                     | ({"automobile liability"} if BARE_AUTO.search(insurance) else set()),
+        "licenses": field("licens").lower(),
+        "certifications": certifications,
+    }
+
+
+def split_requirements(text):
+    for piece in SENTENCE_BREAK.split(text):
+        sentence = LINE_WRAP.sub(" ", piece).strip(" •-*\t")
+        # Table-of-contents lines name requirements without stating any
+        if len(sentence) > 3 and not DOT_LEADER.search(sentence):
+            yield sentence
+
+
+def extract_checks(sentence):
+    # Profile-independent: what the sentence asks for, so one pass serves any number of profiles
+    checks = []
+    ambiguous = bool(AMBIGUOUS.search(sentence))
+    # The year patterns can match at any offset; skip them on the many sentences that can't match
+    has_years = "year" in sentence.lower()
+    for patterns, field, label in ((EXPERIENCE, "experience_years", "Experience"), (EXISTENCE, "existence_years", "Company existence")):
+        for pattern in patterns if has_years else ():
+            match = pattern.search(sentence)
+            if match:
+                required = _number(match.group(1))
+                checks.append({"key": (label, required), "kind": "years", "field": field, "label": label, "value": required})
+                break
+
+    naics = NAICS.search(sentence)
+    if naics:
+        # Several codes in one sentence are alternatives: any one of them qualifies
+        codes = tuple(dict.fromkeys(NAICS_CODE.findall(naics.group(0))))
+        if codes:
+            checks.append({"key": ("NAICS",) + codes, "kind": "naics", "label": f"NAICS {' or '.join(codes)}", "value": codes})
+
+    for label, (pattern, field) in REGISTRATIONS.items():
+        if pattern.search(sentence):
+            checks.append({"key": (label,), "kind": "flag", "field": field, "label": label})
+
+    limits = DOLLAR_AMOUNT.findall(sentence)
+    for label, pattern in COVERAGES.items():
+        if pattern.search(sentence):
+            checks.append({"key": (label,), "kind": "coverage", "label": label.capitalize(), "value": label, "limits": limits})
+
+    for state in STATE_LICENSE.findall(sentence):
+        checks.append({"key": ("license", state), "kind": "license", "label": f"{state} license", "value": state.lower()})
+
+    if CERTIFICATION_REQUIRED.search(sentence):
+        for name, pattern in CERTIFICATIONS.items():
+            if pattern.search(sentence):
+                checks.append({"key": (name,), "kind": "certification", "label": f"{name} certification", "value": name})
+    for check in checks:
+        check["ambiguous"] = ambiguous
+    return checks
+
+
+def evaluate_check(check, profile):
+    kind, label = check["kind"], check["label"]
+    if kind == "years":
+        have = profile[check["field"]]
+        met = have is not None and have >= check["value"]
+        return met, f"{label}: requires {check['value']} years, profile has {have if have is not None else 'none listed'}"
+    if kind == "naics":
+        met = any(code in profile["naics"] for code in check["value"])
+        return met, f"{label}: {'listed' if met else 'not listed'} in profile"
+    if kind == "flag":
+        met = profile[check["field"]]
+        return met, f"{label}: {'on file' if met else 'not on file'}"
+    if kind == "coverage":
+        met = check["value"] in profile["coverages"]
+        detail = f"{label}: {'covered' if met else 'not covered'}"
+        if check["limits"] and met:
+            detail += f" (required limits {', '.join(check['limits'])} not stated in profile)"
+        return met, detail
+    if kind == "license":
+        met = check["value"] in profile["licenses"]
+        return met, f"{label}: {'held' if met else 'not held'}"
+    met = check["value"] in profile["certifications"]
+    return met, f"{label}: {'held' if met else 'not held'}"
+
+
+@lru_cache(maxsize=32)
+def extract_requirements(text):
+    # Cached per text: /verify, /analyze and batch runs on the same document share one pass; callers must not mutate it
+    checks = []
+    unresolved = []
+    seen = set()
+    for sentence in split_requirements(text):
+        # Only sentences that state a requirement are checked; background, contacts and preferences are not
+        if not REQUIREMENT.search(sentence) or PREFERENCE.search(sentence):
+            continue
+        sentence_checks = extract_checks(sentence)
+        for check in sentence_checks:
+            check["source"] = sentence
+        checks.extend(sentence_checks)
+        if sentence_checks or sentence in seen:
+            continue
+        seen.add(sentence)
+        if GAP_TOPIC.search(sentence):
+            unresolved.append(sentence)
+
+    kept, used = [], 0
+    for sentence in unresolved:
+        tokens = count_tokens(sentence)
+        # The first sentence always goes, so a drop never leaves nothing for the model to look at
+        if kept and used + tokens > VERIFY_GAP_TOKENS:
+            break
+        kept.append(sentence)
+        used += tokens
+    return {"checks": checks, "unresolved": kept, "unresolved_dropped": len(unresolved) - len(kept)}
+
+
+def evaluate_requirements(requirements, profile):
+    findings = {}
+    doubtful = []
+    for check in requirements["checks"]:
+        met, detail = evaluate_check(check, profile)
+        if not met and check["ambiguous"]:
+            # "or", "if", "where applicable": a failure here isn't final, so the model reads the sentence
+            if check["source"] not in doubtful:
+                doubtful.append(check["source"])
+            continue
+        status = MET if met else NOT_MET
+        # First mention wins, except a failed check is never hidden by a later pass
+        if check["key"] not in findings or (status == NOT_MET and findings[check["key"]]["status"] == MET):
+            findings[check["key"]] = {"status": status, "detail": detail, "source": check["source"]}
+    return {
+        "findings": list(findings.values()),
+        "unresolved": doubtful + [sentence for sentence in requirements["unresolved"] if sentence not in doubtful],
+        "unresolved_dropped": requirements["unresolved_dropped"],
+    }
+
+
+def format_findings(findings):
+    return "\n".join(f"- [{finding['status'].upper()}] {finding['detail']}" for finding in findings)
+
+
+def format_dropped(report):
+    # Appended to every verdict that left requirements unchecked, local or from the model
+    if not report["unresolved_dropped"]:
+        return ""
+    return (f"\n\nNot Checked:\n- {report['unresolved_dropped']} further requirement sentences were over the "
+            f"VERIFY_GAP_TOKENS budget and were not checked; review them before relying on this result.\n")
+
+
+def render_report(report):
+    # Used when every requirement was settled locally and the model is not needed
+    failed = [finding for finding in report["findings"] if finding["status"] == NOT_MET]
+    status = "NOT ELIGIBLE" if failed else "ELIGIBLE"
+    if failed:
+        summary = f"{len(failed)} of {len(report['findings'])} checked requirements are not met by the company profile."
+    elif report["findings"]:
+        summary = f"All {len(report['findings'])} checked requirements are met by the company profile."
+    else:
+        summary = "No eligibility requirements were found in the RFP."
+    return f"ELIGIBILITY STATUS: {status}\n\nDetails:\n{format_findings(report['findings']) or '- None'}\n\nSummary:\n{summary}\n"
@@ -0,0 +1,110 @@
+import json
+import os
+import re
+import threading
+import numpy as np
+from clients import get_embeddings
+from profile_match import normalize_profile
+
+PROFILE_ID_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+
+
+class ProfileStore:
+    def __init__(self, root_dir, embeddings=None):
+        self.root_dir = root_dir
+        self._embeddings = embeddings
+        self._lock = threading.Lock()
+        self._profiles = {}
+        self._version = 0
+        self._matrix = self._owners = self._ids = None
+        self._matrix_version = -1
+        os.makedirs(root_dir, exist_ok=True)
+        for name in sorted(os.listdir(root_dir)):
+            if name.endswith(".json"):
+                with open(os.path.join(root_dir, name)) as f:
+                    entry = json.load(f)
+                self._remember(name[:-len(".json")], entry["name"], entry["profile"])
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            self._embeddings = get_embeddings()
+        return self._embeddings
+
+    def _path(self, profile_id):
+        return os.path.join(self.root_dir, f"{profile_id}.json")
+
+    def _remember(self, profile_id, name, profile):
+        with self._lock:
+            self._profiles[profile_id] = {
+                "id": profile_id,
+                "name": name,
+                "profile": profile,
+                "normalized": normalize_profile(profile),
+            }
+            self._version += 1
+
+    def register(self, profile_id, name, profile):
+        # In-memory only, for profiles that live in code such as the default COMPANY_PROFILE
+        if profile_id not in self._profiles:
+            self._remember(profile_id, name, profile)
+
+    def put(self, profile_id, name, profile):
+        if not PROFILE_ID_PATTERN.match(profile_id or ""):
+            raise ValueError("Profile ids are 1-64 lowercase letters, digits, '-' or '_'")
+        tmp_path = self._path(profile_id) + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"name": name, "profile": profile}, f, indent=2)
+        os.replace(tmp_path, self._path(profile_id))
+        self._remember(profile_id, name, profile)
+
+    def get(self, profile_id):
+        return self._profiles.get(profile_id)
+
+    def list(self):
+        return [{"id": entry["id"], "name": entry["name"]} for entry in self._profiles.values()]
+
+    def delete(self, profile_id):
+        with self._lock:
+            if self._profiles.pop(profile_id, None) is None:
+                return False
+            self._version += 1
+        if os.path.exists(self._path(profile_id)):
+            os.remove(self._path(profile_id))
+        return True
+
+    def _field_matrix(self):
+        # One row per "label: value" profile field, L2-normalized; rebuilt only after a profile changes
+        with self._lock:
+            if self._matrix is not None and self._matrix_version == self._version:
+                return self._matrix, self._owners, self._ids
+            version = self._version
+            ids = list(self._profiles)
+            texts, owners = [], []
+            for column, profile_id in enumerate(ids):
+                for key, value in self._profiles[profile_id]["profile"].items():
+                    texts.append(f"{key}: {value}")
+                    owners.append(column)
+        vectors = np.asarray(self.embeddings.embed_documents(texts), dtype="float32") if texts else np.zeros((0, 1), "float32")
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        owners = np.asarray(owners, dtype="int64")
+        with self._lock:
+            if version == self._version:
+                self._matrix, self._owners, self._ids = vectors, owners, ids
+                self._matrix_version = version
+        return vectors, owners, ids
+
+    def similarity(self, requirements):
+        # Mean over requirements of the best-matching field in each profile, for all profiles at once
+        matrix, owners, ids = self._field_matrix()
+        if not requirements or not ids:
+            return {profile_id: 0.0 for profile_id in ids}
+        queries = np.asarray(self.embeddings.embed_documents(list(requirements)), dtype="float32")
+        queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        scores = queries @ matrix.T
+        best = np.full((len(queries), len(ids)), -1.0, dtype="float32")
+        np.maximum.at(best.T, owners, scores.T)
+        return dict(zip(ids, best.mean(axis=0).tolist()))
+
+
+profile_store = ProfileStore(os.getenv("PROFILE_STORE_DIR", "profiles"))
@@ -0,0 +1,191 @@
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import deque
+import metrics
+
+# Provider quota; keep these a little under the real limits of the API key's tier
+REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", 300))
+TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", 1_000_000))
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+# Bucket size: how much unused quota may be spent at once
+BURST_SECONDS = float(os.getenv("LLM_BURST_SECONDS", 5))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 5))
+BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", 1))
+BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", 60))
+
+INTERACTIVE = 0
+BULK = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+RETRYABLE_NAMES = ("ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "DeadlineExceeded", "InternalServerError")
+RETRYABLE_TEXT = ("429", "503", "quota", "rate limit", "resource exhausted", "overloaded", "unavailable")
+
+# Unlabelled work (background jobs, bulk runs) yields to requests that set INTERACTIVE
+_priority = contextvars.ContextVar("llm_priority", default=BULK)
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def set_priority(priority):
+    _priority.set(priority)
+
+
+def current_priority():
+    return _priority.get()
+
+
+def is_retryable(error):
+    if any(name in type(error).__name__ for name in RETRYABLE_NAMES):
+        return True
+    message = str(error).lower()
+    return any(text in message for text in RETRYABLE_TEXT)
+
+
+def backoff_seconds(attempt):
+    # Full jitter: concurrent callers that failed together spread out instead of retrying in lockstep
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute, tokens_per_minute, max_concurrency, burst_seconds=BURST_SECONDS):
+        self.request_rate = requests_per_minute / 60
+        self.token_rate = tokens_per_minute / 60
+        self.request_capacity = max(1.0, self.request_rate * burst_seconds)
+        self.token_capacity = max(1.0, self.token_rate * burst_seconds)
+        self.max_concurrency = max_concurrency
+        self.concurrency = max_concurrency
+        self._requests = self.request_capacity
+        self._tokens = self.token_capacity
+        self._updated = time.monotonic()
+        self._in_flight = 0
+        self._successes = 0
+        self._queues = {INTERACTIVE: deque(), BULK: deque()}
+        self._cond = threading.Condition()
+        self.throttled = 0
+        self.retries = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.request_capacity, self._requests + elapsed * self.request_rate)
+        self._tokens = min(self.token_capacity, self._tokens + elapsed * self.token_rate)
+
+    def acquire(self, tokens, priority):
+        # Prompts larger than the bucket wait for a full bucket and run alone rather than never
+        tokens = min(tokens, self.token_capacity)
+        started = time.perf_counter()
+        ticket = object()
+        with self._cond:
+            queue = self._queues[priority]
+            queue.append(ticket)
+            try:
+                while True:
+                    self._refill()
+                    # FIFO within a priority class; any waiting interactive call goes before bulk
+                    outranked = queue[0] is not ticket or any(self._queues[level] for level in self._queues if level < priority)
+                    if not outranked and self._in_flight < self.concurrency:
+                        if self._requests >= 1 and self._tokens >= tokens:
+                            self._requests -= 1
+                            self._tokens -= tokens
+                            self._in_flight += 1
+                            break
+                        timeout = max((1 - self._requests) / self.request_rate, (tokens - self._tokens) / self.token_rate, 0.001)
+                    else:
+                        timeout = None
+                    self._cond.wait(timeout)
+            finally:
+                queue.remove(ticket)
+                self._cond.notify_all()
+        metrics.stage_seconds.observe(time.perf_counter() - started, stage=f"rate_limit_{PRIORITY_NAMES[priority]}")
+
+    def release(self, throttled=False):
+        with self._cond:
+            self._in_flight -= 1
+            if throttled:
+                # Multiplicative decrease, and spend the buckets so every caller pauses for a refill
+                self.throttled += 1
+                self.concurrency = max(1, self.concurrency // 2)
+                self._successes = 0
+                self._requests = min(self._requests, 0.0)
+                self._tokens = min(self._tokens, 0.0)
+            else:
+                # Additive increase: one more slot after a full window of clean calls
+                self._successes += 1
+                if self._successes >= self.concurrency and self.concurrency < self.max_concurrency:
+                    self.concurrency += 1
+                    self._successes = 0
+            self._cond.notify_all()
+
+    def call(self, fn, tokens=0, priority=None):
+        priority = current_priority() if priority is None else priority
+        for attempt in range(MAX_RETRIES + 1):
+            self.acquire(tokens, priority)
+            try:
+                result = fn()
+            except Exception as e:
+                retryable = is_retryable(e)
+                self.release(throttled=retryable)
+                if not retryable:
+                    raise
+                self._retry_or_raise(e, attempt)
+                continue
+            self.release()
+            return result
+
+    def stream(self, open_stream, tokens=0, priority=None):
+        # Priority is read now, in the caller's context; the generator body runs later
+        priority = current_priority() if priority is None else priority
+
+        def generate():
+            for attempt in range(MAX_RETRIES + 1):
+                self.acquire(tokens, priority)
+                started = False
+                throttled = False
+                try:
+                    for chunk in open_stream():
+                        started = True
+                        yield chunk
+                    return
+                except Exception as e:
+                    throttled = is_retryable(e)
+                    # Once text reached the client a retry would repeat it, so only retry before the first chunk
+                    if not throttled or started:
+                        raise
+                    error = e
+                finally:
+                    self.release(throttled=throttled)
+                self._retry_or_raise(error, attempt)
+        return generate()
+
+    def _retry_or_raise(self, error, attempt):
+        delay = backoff_seconds(attempt)
+        if attempt == MAX_RETRIES:
+            raise RateLimitExceeded(f"Model quota exceeded after {MAX_RETRIES} retries: {error}", retry_after=max(1, round(delay))) from error
+        with self._cond:
+            self.retries += 1
+        time.sleep(delay)
+
+    def stats(self):
+        with self._cond:
+            self._refill()
+            return {
+                "concurrency": self.concurrency,
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self._in_flight,
+                "waiting": {PRIORITY_NAMES[level]: len(queue) for level, queue in self._queues.items()},
+                "requests_available": round(self._requests, 2),
+                "tokens_available": round(self._tokens),
+                "throttled": self.throttled,
+                "retries": self.retries,
+            }
+
+
+rate_limiter = RateLimiter(REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE, MAX_CONCURRENCY)
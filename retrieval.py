@@ -0,0 +1,117 @@
+import math
+import os
+import re
+import threading
+from collections import Counter
+from weakref import WeakKeyDictionary
+import metrics
+
+TOKEN_PATTERN = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it of on or our "
+    "should the their there this to was we what when where which who will with "
+    "you your any all about must required requirement requirements".split()
+)
+# A lexical hit is trusted without embedding the question only for short
+# keyword-style queries with a clear winner in the document.
+LEXICAL_MAX_TERMS = int(os.getenv("LEXICAL_MAX_TERMS", 4))
+LEXICAL_MAX_DOC_FRACTION = float(os.getenv("LEXICAL_MAX_DOC_FRACTION", 0.5))
+LEXICAL_MARGIN = float(os.getenv("LEXICAL_MARGIN", 1.2))
+RRF_K = 60
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def keywords(text):
+    return list(dict.fromkeys(token for token in tokenize(text) if token not in STOPWORDS))
+
+
+class BM25Index:
+    def __init__(self, texts, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_counts = [Counter(tokenize(text)) for text in texts]
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        self.postings = {}
+        for index, counts in enumerate(self.term_counts):
+            for term in counts:
+                self.postings.setdefault(term, []).append(index)
+        total = len(texts)
+        self.idf = {
+            term: math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def __len__(self):
+        return len(self.term_counts)
+
+    def search(self, terms, k=4):
+        scores = {}
+        for term in terms:
+            for index in self.postings.get(term, ()):
+                frequency = self.term_counts[index][term]
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[index] / (self.average_length or 1))
+                scores[index] = scores.get(index, 0.0) + self.idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def confident(self, terms, hits):
+        # The best chunk must contain every keyword, at least one keyword must be
+        # selective in this document, and the best chunk must clearly outscore the rest
+        if not hits or not terms or len(terms) > LEXICAL_MAX_TERMS:
+            return False
+        top = self.term_counts[hits[0][0]]
+        if any(term not in top for term in terms):
+            return False
+        if not any(len(self.postings[term]) <= LEXICAL_MAX_DOC_FRACTION * len(self) for term in terms):
+            return False
+        return len(hits) == 1 or hits[0][1] >= LEXICAL_MARGIN * hits[1][1]
+
+
+_indexes = WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def _documents(vector_store):
+    docstore = vector_store.docstore
+    return [docstore.search(doc_id) for _, doc_id in sorted(vector_store.index_to_docstore_id.items())]
+
+
+def lexical_index(vector_store):
+    # Built lazily from the FAISS docstore and dropped with the store when it is evicted
+    with _lock:
+        entry = _indexes.get(vector_store)
+    if entry is None:
+        documents = _documents(vector_store)
+        entry = (BM25Index([doc.page_content for doc in documents]), documents)
+        with _lock:
+            _indexes[vector_store] = entry
+    return entry
+
+
+def hybrid_search(vector_store, question, k=4):
+    index, documents = lexical_index(vector_store)
+    terms = keywords(question)
+    hits = index.search(terms, k)
+    if len(index) <= k:
+        # Every chunk is returned either way, so embedding the question buys nothing
+        metrics.retrieval_total.inc(path="lexical")
+        ranked = [i for i, _ in hits] + [i for i in range(len(index)) if i not in dict(hits)]
+        return [documents[i] for i in ranked]
+    if index.confident(terms, hits):
+        metrics.retrieval_total.inc(path="lexical")
+        return [documents[i] for i, _ in hits]
+
+    metrics.retrieval_total.inc(path="hybrid")
+    vector_docs = vector_store.similarity_search(question, k=k)
+    # Reciprocal rank fusion of the two rankings, keyed by chunk text
+    fused = {}
+    for rank, doc in enumerate(vector_docs):
+        fused.setdefault(doc.page_content, [doc, 0.0])[1] += 1 / (RRF_K + rank + 1)
+    for rank, (i, _) in enumerate(hits):
+        doc = documents[i]
+        fused.setdefault(doc.page_content, [doc, 0.0])[1] += 1 / (RRF_K + rank + 1)
+    ranked = sorted(fused.values(), key=lambda item: item[1], reverse=True)
+    return [doc for doc, _ in ranked[:k]]
@@ -0,0 +1,121 @@
+import errno
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+try:
+    import fcntl
+except ImportError:
+    # No POSIX record locks (Windows): coalescing still works between threads of one process
+    fcntl = None
+
+# Keys map to one-byte ranges of a single lock file, so workers never create per-key files
+LOCK_SLOTS = 2 ** 31 - 1
+# A blocking lockf reports false deadlocks (EDEADLK) once several threads wait on one file, so the lock is polled;
+# after this long the caller computes on its own rather than failing
+LOCK_TIMEOUT_SECONDS = float(os.getenv("SINGLEFLIGHT_LOCK_TIMEOUT_SECONDS", 120))
+LOCK_POLL_SECONDS = 0.05
+
+
+class Flight:
+    def __init__(self, owner, key, leader, future, locked=False):
+        self._owner = owner
+        self.key = key
+        self.leader = leader
+        self._future = future
+        self.locked = locked
+
+    def wait(self):
+        # The leader's value, its exception, or None when it gave up without a result
+        return self._future.result()
+
+    def finish(self, value=None, error=None):
+        self._owner._finish(self, value, error)
+
+
+class SingleFlight:
+    def __init__(self, lock_path=None, lock_timeout=LOCK_TIMEOUT_SECONDS):
+        self.lock_path = lock_path
+        self.lock_timeout = lock_timeout
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._fd = None
+        self.coalesced = 0
+
+    def _offset(self, key):
+        return int(key[:15], 16) % LOCK_SLOTS
+
+    def _lock_file(self, key):
+        # True when this process now holds the key's byte; False means go ahead without cross-process coalescing
+        if not self.lock_path or fcntl is None:
+            return False
+        try:
+            with self._lock:
+                if self._fd is None:
+                    self._fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError:
+            return False
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            try:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, self._offset(key))
+                return True
+            except OSError as e:
+                # Another worker process leads the same key
+                if e.errno not in (errno.EAGAIN, errno.EACCES, errno.EDEADLK) or time.monotonic() >= deadline:
+                    return False
+            time.sleep(LOCK_POLL_SECONDS)
+
+    def _unlock_file(self, key):
+        fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, self._offset(key))
+
+    def begin(self, key):
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return Flight(self, key, False, future)
+            future = self._flights[key] = Future()
+        try:
+            locked = self._lock_file(key)
+        except BaseException as e:
+            with self._lock:
+                del self._flights[key]
+            future.set_exception(e)
+            raise
+        return Flight(self, key, True, future, locked)
+
+    def _finish(self, flight, value, error):
+        # Unlock before forgetting the flight: POSIX locks are per process, so a new leader
+        # in this process would otherwise have its fresh lock released by this call
+        if flight.locked:
+            self._unlock_file(flight.key)
+        with self._lock:
+            del self._flights[flight.key]
+        if error is not None:
+            flight._future.set_exception(error)
+        else:
+            flight._future.set_result(value)
+
+    def run(self, key, compute, lookup):
+        # lookup() returns a stored result or None; it covers work another process finished while we waited
+        while True:
+            flight = self.begin(key)
+            if not flight.leader:
+                value = flight.wait()
+                if value is not None:
+                    return value
+                continue
+            try:
+                value = lookup()
+                if value is not None:
+                    with self._lock:
+                        self.coalesced += 1
+                else:
+                    value = compute()
+            except BaseException as e:
+                flight.finish(error=e)
+                raise
+            flight.finish(value)
+            return value
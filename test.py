@@ -1,11 +1,7 @@
 import streamlit as st 
-from PyPDF2 import PdfReader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 import os
-from io import BytesIO
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from corpus_index import CorpusIndex, load_corpus
 import google.generativeai as genai
-from langchain.vectorstores import FAISS
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.chains.question_answering import load_qa_chain
 from langchain.prompts import PromptTemplate
@@ -16,23 +12,21 @@ load_dotenv()
 
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
-def get_pdf_text(pdf_docs):
-    text = ""
+def update_corpus(pdf_docs):
+    # Only PDFs whose bytes are not already in the corpus get chunked and embedded
+    corpus = CorpusIndex("faiss_index")
+    added = 0
     for pdf in pdf_docs:
-        pdf_reader = PdfReader(BytesIO(pdf.read()))  
-        for page in pdf_reader.pages:
-            text += page.extract_text()
-    return text
+        _, is_new = corpus.add_document(pdf.name, pdf.read())
+        added += is_new
+    corpus.save()
+    return added, len(corpus.documents())
 
-def get_text_chunks(text):
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=10000, chunk_overlap=1000)
-    chunks = text_splitter.split_text(text)
-    return chunks
-
-def get_vector_store(text_chunks):
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-    vector_store = FAISS.from_texts(text_chunks, embedding=embeddings)
-    vector_store.save_local("faiss_index")
+def remove_from_corpus(doc_hashes):
+    corpus = CorpusIndex("faiss_index")
+    for doc_hash in doc_hashes:
+        corpus.remove_document(doc_hash)
+    corpus.save()
 
 def get_conversational_chain():
     prompt_template = """
@@ -52,11 +46,12 @@ def get_conversational_chain():
     return chain
 
 def user_input(user_question):
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-
-    new_db = FAISS.load_local("faiss_index", embeddings, allow_dangerous_deserialization=True)
+    vector_store = load_corpus("faiss_index").vector_store
+    if vector_store is None:
+        st.error("No documents indexed yet. Upload PDFs first.")
+        return user_question, None
 
-    docs = new_db.similarity_search(user_question)
+    docs = vector_store.similarity_search(user_question)
     
     chain = get_conversational_chain()
 
@@ -67,6 +62,12 @@ def user_input(user_question):
     
     answer = response["output_text"]
     st.write("Reply: ", answer)
+    sources = dict.fromkeys(
+        f"{doc.metadata['source']} p. {'-'.join(str(page) for page in sorted({doc.metadata['pages'][0], doc.metadata['pages'][-1]}))}"
+        for doc in docs if doc.metadata.get("pages")
+    )
+    if sources:
+        st.caption("Sources: " + "; ".join(sources))
     
     return user_question, answer
 
@@ -99,7 +100,8 @@ def main():
 
     if user_question:
         question, answer = user_input(user_question)
-        questions_answers.append((question, answer))
+        if answer is not None:
+            questions_answers.append((question, answer))
     
     with st.sidebar:
         st.title("Menu:")
@@ -107,13 +109,18 @@ def main():
         if st.button("Submit & Proceed"):
             if pdf_docs:
                 with st.spinner("Preprocessing..."):
-                    raw_text = get_pdf_text(pdf_docs)
-                    text_chunks = get_text_chunks(raw_text)
-                    get_vector_store(text_chunks)
-                    st.success("Done")
+                    added, total = update_corpus(pdf_docs)
+                    st.success(f"Done: {added} new, {total} documents indexed")
             else:
                 st.error("Please upload at least one PDF file.")
         
+        indexed = load_corpus("faiss_index").documents()
+        if indexed:
+            to_remove = st.multiselect("Indexed documents", list(indexed), format_func=indexed.get)
+            if st.button("Remove Selected") and to_remove:
+                remove_from_corpus(to_remove)
+                st.success(f"Removed {len(to_remove)} documents")
+        
         if st.button("Save to Word"):
             if questions_answers:
                 save_to_word(questions_answers)
@@ -0,0 +1,99 @@
+import pytest
+import profile_match
+from profile_match import MET, NOT_MET, evaluate_requirements, extract_requirements, normalize_profile
+
+PROFILE = normalize_profile({
+    "Company Length of Existence": "9 years",
+    "Years of Experience in Temporary Staffing": "7 years",
+    "SAM.gov Registration Date": "03/01/2022",
+    "NAICS Codes": "561320 – Temporary Help Services; 541611 – Admin Management",
+    "Bank Letter of Creditworthiness": "Not Available",
+    "Certificate of Insurance": "Travelers Insurance; includes Workers' Comp, Liability, and Auto",
+    "Licenses": "Texas Employment Agency License #TXEA-34892",
+    "MBE Certification": "NO",
+})
+
+
+def check(text):
+    return evaluate_requirements(extract_requirements(text), PROFILE)
+
+
+def statuses(report):
+    return {finding["detail"]: finding["status"] for finding in report["findings"]}
+
+
+def test_failed_requirement_is_final():
+    report = check("Offeror must have a minimum of ten (10) years of experience.")
+    assert statuses(report) == {"Experience: requires 10 years, profile has 7": NOT_MET}
+    assert report["unresolved"] == []
+
+
+def test_preferred_qualification_is_not_a_requirement():
+    report = check("Offerors with at least 10 years of experience in staffing are preferred.")
+    assert report["findings"] == []
+    assert report["unresolved"] == []
+
+
+def test_sentence_without_requirement_wording_is_not_checked():
+    report = check("Our firm has served the county for 15 years of experience in this field.")
+    assert report["findings"] == []
+
+
+def test_naics_codes_in_one_sentence_are_alternatives():
+    report = check("The vendor must be registered under NAICS 561310 or 561320.")
+    assert statuses(report) == {"NAICS 561310 or 561320: listed in profile": MET}
+
+
+def test_naics_alternatives_none_listed_go_to_the_model():
+    sentence = "The vendor must be registered under NAICS 999999 or 888888."
+    report = check(sentence)
+    assert report["findings"] == []
+    assert report["unresolved"] == [sentence]
+
+
+def test_failure_in_conditional_sentence_goes_to_the_model():
+    sentence = "If applicable, the offeror must have at least 10 years of experience."
+    report = check(sentence)
+    assert report["findings"] == []
+    assert report["unresolved"] == [sentence]
+
+
+def test_auto_renew_is_not_automobile_liability():
+    report = check("This agreement will auto-renew and the contractor must give 30 days notice.")
+    assert report["findings"] == []
+
+
+def test_automobile_liability_is_matched_and_bare_auto_in_profile_counts():
+    report = check("The contractor must maintain automobile liability insurance of $1,000,000.")
+    assert statuses(report) == {
+        "Automobile liability: covered (required limits $1,000,000 not stated in profile)": MET,
+    }
+
+
+def test_person_named_sam_is_not_a_registration():
+    report = check("Questions must be sent to Sam Smith in writing.")
+    assert report["findings"] == []
+
+
+@pytest.mark.parametrize("sentence", [
+    "Vendors must be registered in SAM before award.",
+    "Vendors must be registered in sam.gov before award.",
+    "Vendors must be registered in the System for Award Management.",
+])
+def test_sam_registration(sentence):
+    assert statuses(check(sentence)) == {"SAM.gov registration: on file": MET}
+
+
+def test_unresolved_overflow_is_counted(monkeypatch):
+    monkeypatch.setattr(profile_match, "VERIFY_GAP_TOKENS", 12)
+    text = "\n\n".join(f"Bidder must provide {n} references from past performance." for n in ("two", "three", "four"))
+    report = check(text)
+    assert len(report["unresolved"]) == 1
+    assert report["unresolved_dropped"] == 2
+    assert "2 further requirement sentences" in profile_match.format_dropped(report)
+
+
+def test_oversized_requirement_is_still_sent():
+    report = check("Bidder must provide " + "financial statements and references, " * 400 + "for review.")
+    assert len(report["unresolved"]) == 1
+    assert report["unresolved_dropped"] == 0
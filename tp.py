@@ -1,6 +1,5 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from PyPDF2 import PdfReader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 import google.generativeai as genai
@@ -10,7 +9,7 @@ from langchain.chains.question_answering import load_qa_chain
 from langchain.prompts import PromptTemplate
 from dotenv import load_dotenv
 import os
-from io import BytesIO
+from pdf_extract import extract_text
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
@@ -19,10 +18,7 @@ load_dotenv()
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
 def process_pdf(pdf_file):
-    pdf_reader = PdfReader(BytesIO(pdf_file.read()))
-    text = ""
-    for page in pdf_reader.pages:
-        text += page.extract_text()
+    text = extract_text(pdf_file.read()).text
     
     text_splitter = RecursiveCharacterTextSplitter(chunk_size=10000, chunk_overlap=1000)
     chunks = text_splitter.split_text(text)
@@ -201,10 +197,7 @@ def generate_summary():
         
         pdf_file = request.files['pdf']
         # Extract text from PDF
-        pdf_reader = PdfReader(BytesIO(pdf_file.read()))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text()
+        text = extract_text(pdf_file.read()).text
         
         # Generate analysis
         analysis = analyze_bid_requirements(text)
@@ -224,10 +217,7 @@ def generate_checklist():
         
         pdf_file = request.files['pdf']
         # Extract text from PDF
-        pdf_reader = PdfReader(BytesIO(pdf_file.read()))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text()
+        text = extract_text(pdf_file.read()).text
         
         # Generate checklist
         checklist = analyze_checklist_requirements(text)
@@ -247,10 +237,7 @@ def analyze_contract():
         
         pdf_file = request.files['pdf']
         # Extract text from PDF
-        pdf_reader = PdfReader(BytesIO(pdf_file.read()))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text()
+        text = extract_text(pdf_file.read()).text
         
         # Generate analysis
         analysis = analyze_contract_risks(text)
@@ -0,0 +1,138 @@
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from langchain.vectorstores import FAISS
+from index_factory import tune
+from metrics import timed
+
+
+class VectorStoreCache:
+    def __init__(self, max_entries=16, ttl_seconds=3600, disk_dir=None, max_disk_entries=256):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key)
+
+    def _expired(self, stored_at):
+        return self.ttl_seconds and time.time() - stored_at > self.ttl_seconds
+
+    def _evict_expired(self):
+        for key in [k for k, (_, stored_at) in self._entries.items() if self._expired(stored_at)]:
+            del self._entries[key]
+
+    def _remember(self, key, vector_store):
+        self._entries[key] = (vector_store, time.time())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key, embeddings):
+        with self._lock:
+            self._evict_expired()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        path = self._disk_path(key) if self.disk_dir else None
+        if path and os.path.isdir(path):
+            if self._expired(os.path.getmtime(path)):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    with timed("index_load"):
+                        vector_store = FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+                        tune(vector_store.index)
+                except Exception:
+                    # Left half-written by an older version or a crash; rebuild it
+                    shutil.rmtree(path, ignore_errors=True)
+                    vector_store = None
+                if vector_store is not None:
+                    # Directory mtime doubles as last use for the disk sweep
+                    try:
+                        os.utime(path)
+                    except FileNotFoundError:
+                        pass
+                    with self._lock:
+                        self._remember(key, vector_store)
+                        self.disk_hits += 1
+                    return vector_store
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, vector_store):
+        with self._lock:
+            self._remember(key, vector_store)
+        if self.disk_dir:
+            # Saved beside and renamed in, so readers never load a half-written index
+            path = self._disk_path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            vector_store.save_local(tmp_path)
+            try:
+                os.rename(tmp_path, path)
+            except OSError:
+                # A concurrent build of the same document got there first
+                shutil.rmtree(tmp_path, ignore_errors=True)
+            self._sweep_disk()
+
+    def _sweep_disk(self):
+        # Keys of other settings or deleted documents are never asked for again, so expiry can't wait for get()
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            path = os.path.join(self.disk_dir, name)
+            try:
+                mtime = os.path.getmtime(path)
+            except FileNotFoundError:
+                continue
+            if self._expired(mtime):
+                shutil.rmtree(path, ignore_errors=True)
+            elif not name.endswith(".tmp"):
+                entries.append((mtime, path))
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_disk_entries)]:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def get_or_build(self, key, embeddings, build):
+        vector_store = self.get(key, embeddings)
+        if vector_store is None:
+            vector_store = build()
+            self.put(key, vector_store)
+        return vector_store
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+vector_cache = VectorStoreCache(
+    max_entries=int(os.getenv("VECTOR_CACHE_MAX_ENTRIES", 16)),
+    ttl_seconds=int(os.getenv("VECTOR_CACHE_TTL_SECONDS", 3600)),
+    disk_dir=os.getenv("VECTOR_CACHE_DIR", "faiss_cache") or None,
+    max_disk_entries=int(os.getenv("VECTOR_CACHE_MAX_DISK_ENTRIES", 256)),
+)
@@ -0,0 +1,36 @@
+import hashlib
+from difflib import SequenceMatcher
+from boilerplate import split_pages
+from map_reduce import map_sections
+
+
+def page_hashes(text):
+    return [hashlib.sha256(page.encode("utf-8")).hexdigest() for page in split_pages(text)]
+
+
+def diff_versions(old_text, new_text, old_prompt_text=None, new_prompt_text=None):
+    # Pages are compared on text that keeps its page breaks; section reuse is measured on the
+    # text the analyses actually prompt with, which may be the raw extraction
+    old_hashes = page_hashes(old_text)
+    new_hashes = page_hashes(new_text)
+    changed, removed = [], []
+    matcher = SequenceMatcher(a=old_hashes, b=new_hashes, autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag in ("replace", "delete"):
+            removed.extend(range(old_start + 1, old_end + 1))
+        if tag in ("replace", "insert"):
+            changed.extend(range(new_start + 1, new_end + 1))
+
+    # Map calls whose text is unchanged hit the LLM cache, so only the rest cost a call;
+    # a document under the section budget is a single whole-document call
+    old_sections = set(map_sections(old_text if old_prompt_text is None else old_prompt_text))
+    new_sections = map_sections(new_text if new_prompt_text is None else new_prompt_text)
+    reused = sum(1 for section in new_sections if section in old_sections)
+    return {
+        "pages": len(new_hashes),
+        "changed_pages": changed,
+        "removed_pages": removed,
+        "unchanged_pages": len(new_hashes) - len(changed),
+        "sections": len(new_sections),
+        "sections_reused": reused,
+    }